@@ -2,8 +2,32 @@
 Alembic Autoscan - Automatically discover and import SQLAlchemy models for Alembic migrations.
 """
 
-from .integration import import_models
-from .scanner import ModelScanner
+from typing import TYPE_CHECKING, Any, List
+
+if TYPE_CHECKING:
+    from .integration import import_models
+    from .scanner import ModelScanner
 
 __version__ = "1.0.0"
 __all__ = ["ModelScanner", "import_models"]
+
+# Public names are resolved lazily (PEP 562) so that importing the package, or
+# one of its lightweight submodules, does not load the scanner until it is used.
+_LAZY_EXPORTS = {
+    "ModelScanner": ".scanner",
+    "import_models": ".integration",
+}
+
+
+def __getattr__(name: str) -> Any:
+    if name in _LAZY_EXPORTS:
+        import importlib
+
+        value = getattr(importlib.import_module(_LAZY_EXPORTS[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__() -> List[str]:
+    return sorted(set(globals()) | set(__all__))
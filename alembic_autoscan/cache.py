@@ -1,18 +1,114 @@
 """
 Cache management for alembic-autoscan.
 
-Caches scan results based on file modification times to speed up
-subsequent scans, especially in large codebases.
+Caches scan results to speed up subsequent scans, especially in large
+codebases. Each entry records a file's mtime_ns, size and content digest
+along with its result, so a file whose modification time changed without
+its contents changing (a branch switch, a fresh checkout, a touch) is not
+parsed again.
+
+The cache file is an append-only log of zlib-compressed JSON records, each
+prefixed with its length. Each record holds the entries that changed for a
+single scan configuration, so a save only writes what is new instead of
+rewriting every configuration. The log is compacted once it holds more than
+twice as many entries as are live, dropping configurations that have not
+been saved for CACHE_MAX_AGE seconds.
 """
 
-import hashlib
+import contextlib
+import functools
 import json
 import logging
+import os
+import struct
+import time
+import zlib
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple, Union, cast
 
 logger = logging.getLogger(__name__)
 
+# First line of every cache file, bump the version whenever the record layout changes
+CACHE_HEADER = b"alembic-autoscan cache v5\n"
+
+# Records are framed by their compressed length as a 4-byte big-endian integer
+RECORD_LENGTH = struct.Struct(">I")
+
+# Fastest zlib level, paths and field values compress well even at this level
+COMPRESSION_LEVEL = 1
+
+# Configurations not saved for this long are evicted when the log is compacted
+CACHE_MAX_AGE = 30 * 24 * 60 * 60
+
+# A configuration whose entries did not change is re-stamped at most this often
+CACHE_TOUCH_INTERVAL = 24 * 60 * 60
+
+# Prefer orjson when installed, it encodes and decodes the cache much faster
+try:
+    import orjson
+except ImportError:
+    orjson = None  # type: ignore
+
+# Prefer xxhash when installed, it digests file contents much faster than hashlib
+try:
+    import xxhash
+except ImportError:
+    xxhash = None  # type: ignore
+
+# Cached result of one file: (mtime_ns, is_model, module_path, content_digest, size)
+CacheEntry = Tuple[int, bool, Optional[str], Optional[str], int]
+
+
+def _dumps(obj: Any) -> bytes:
+    """Serialize an object to compact JSON bytes."""
+    if orjson is not None:
+        return cast(bytes, orjson.dumps(obj))
+    return json.dumps(obj, separators=(",", ":")).encode("utf-8")
+
+
+def _loads(data: bytes) -> Any:
+    """Deserialize JSON bytes."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def content_digest(data: bytes) -> str:
+    """Compute a fast 64-bit digest of file contents, as a hex string."""
+    if xxhash is not None:
+        return str(xxhash.xxh3_64_hexdigest(data))
+    import hashlib
+
+    return hashlib.blake2b(data, digest_size=8).hexdigest()
+
+
+@functools.lru_cache(maxsize=256)
+def _cache_key(
+    base_path: str,
+    include_patterns: Tuple[str, ...],
+    exclude_patterns: Tuple[str, ...],
+) -> str:
+    """
+    Hash a scan configuration into a cache key, memoised across cache instances.
+
+    Pattern order does not matter. The patterns are sorted here rather than by
+    the caller, so the sort only runs on a memo miss, and the key is hashed
+    from the repr of a tuple so patterns containing separators cannot collide.
+    """
+    import hashlib
+
+    key_data = repr((base_path, tuple(sorted(include_patterns)), tuple(sorted(exclude_patterns))))
+    return hashlib.blake2b(key_data.encode(), digest_size=16).hexdigest()
+
+
+class _CacheLog(NamedTuple):
+    """State of the cache log after replaying every record."""
+
+    entries: Dict[str, Dict[str, CacheEntry]]
+    saved_at: Dict[str, float]
+    written: Optional[int]
+    size: int
+
 
 class ScanCache:
     """Cache for model discovery results."""
@@ -32,7 +128,8 @@ class ScanCache:
         self.enabled = enabled
         self.cache_dir = cache_dir or Path.cwd()
         self.cache_file = self.cache_dir / ".alembic-autoscan.cache"
-        self._cache: Dict[str, Dict[str, Any]] = {}
+        # Parsed log memoised against the (mtime_ns, size) of the cache file
+        self._memo: Optional[Tuple[Tuple[int, int], _CacheLog]] = None
 
     def _generate_cache_key(
         self,
@@ -41,17 +138,89 @@ class ScanCache:
         exclude_patterns: List[str],
     ) -> str:
         """Generate a unique cache key based on scan configuration."""
-        key_data = (
-            f"{base_path}:{','.join(sorted(include_patterns))}:{','.join(sorted(exclude_patterns))}"
+        return _cache_key(base_path, tuple(include_patterns), tuple(exclude_patterns))
+
+    def _read_log(self) -> _CacheLog:
+        """
+        Replay the cache log into per-configuration entries.
+
+        The parsed log is kept in memory and reused for as long as the cache
+        file's modification time and size are unchanged. Callers must not
+        mutate the returned dictionaries.
+
+        A record cut short by an interrupted append is ignored along with
+        anything after it; the entry count is then None to signal that the log
+        must be rewritten before anything else is appended.
+
+        Returns:
+            The entries and last save time keyed by cache key, and the number of
+            entries written to the log or None if the log is torn
+
+        Raises:
+            FileNotFoundError: If the cache file does not exist
+        """
+        st = os.stat(self.cache_file)
+        signature = (st.st_mtime_ns, st.st_size)
+        if self._memo is not None and self._memo[0] == signature:
+            return self._memo[1]
+
+        all_caches: Dict[str, Dict[str, CacheEntry]] = {}
+        saved_at: Dict[str, float] = {}
+        written = 0
+        torn = False
+
+        with open(self.cache_file, "rb") as f:
+            if f.readline() != CACHE_HEADER:
+                raise ValueError("unsupported cache file format")
+            data = f.read()
+
+        offset = 0
+        while offset < len(data):
+            if len(data) - offset < RECORD_LENGTH.size:
+                torn = True
+                break
+            (length,) = RECORD_LENGTH.unpack_from(data, offset)
+            offset += RECORD_LENGTH.size
+            payload = data[offset : offset + length]
+            if len(payload) != length:
+                torn = True
+                break
+            offset += length
+
+            record = _loads(zlib.decompress(payload))
+            entries = all_caches.setdefault(record["key"], {})
+            saved_at[record["key"]] = record["saved_at"]
+            paths = record["paths"]
+            entries.update(
+                zip(
+                    paths,
+                    zip(
+                        record["mtimes"],
+                        record["is_model"],
+                        record["module_paths"],
+                        record["digests"],
+                        record["sizes"],
+                    ),
+                )
+            )
+            for file_path in record["removed"]:
+                entries.pop(file_path, None)
+            written += len(paths) + len(record["removed"])
+
+        if torn:
+            logger.debug("Ignoring truncated record at the end of the cache file")
+        log = _CacheLog(
+            all_caches, saved_at, None if torn else written, len(CACHE_HEADER) + len(data)
         )
-        return hashlib.sha256(key_data.encode()).hexdigest()
+        self._memo = (signature, log)
+        return log
 
     def load(
         self,
         base_path: str,
         include_patterns: List[str],
         exclude_patterns: List[str],
-    ) -> Optional[Dict[str, Tuple[float, bool, Optional[str]]]]:
+    ) -> Optional[Dict[str, CacheEntry]]:
         """
         Load cache for the given configuration.
 
@@ -61,42 +230,32 @@ class ScanCache:
             exclude_patterns: Exclude patterns used
 
         Returns:
-            Dictionary mapping file paths to (mtime, is_model, module_path)
+            Dictionary mapping file paths to
+            (mtime_ns, is_model, module_path, digest, size)
             or None if cache doesn't exist or is invalid
         """
         if not self.enabled:
             return None
 
-        if not self.cache_file.exists():
-            logger.debug("No cache file found")
-            return None
-
         try:
-            with open(self.cache_file, encoding="utf-8") as f:
-                all_caches = json.load(f)
+            all_caches = self._read_log().entries
 
             cache_key = self._generate_cache_key(base_path, include_patterns, exclude_patterns)
 
             if cache_key not in all_caches:
-                logger.debug(f"No cache entry for key: {cache_key}")
+                logger.debug("No cache entry for key: %s", cache_key)
                 return None
 
-            cache_data = all_caches[cache_key]
-            logger.info(f"Loaded cache with {len(cache_data)} entries")
-
-            # Convert to the expected format
-            result: Dict[str, Tuple[float, bool, Optional[str]]] = {}
-            for file_path, entry in cache_data.items():
-                result[file_path] = (
-                    entry["mtime"],
-                    entry["is_model"],
-                    entry.get("module_path"),
-                )
+            result = dict(all_caches[cache_key])
+            logger.info("Loaded cache with %d entries", len(result))
 
             return result
 
-        except (json.JSONDecodeError, KeyError, ValueError) as e:
-            logger.warning(f"Failed to load cache: {e}")
+        except FileNotFoundError:
+            logger.debug("No cache file found")
+            return None
+        except (json.JSONDecodeError, KeyError, TypeError, ValueError, zlib.error) as e:
+            logger.warning("Failed to load cache: %s", e)
             return None
 
     def save(
@@ -104,78 +263,212 @@ class ScanCache:
         base_path: str,
         include_patterns: List[str],
         exclude_patterns: List[str],
-        file_data: Dict[str, Tuple[float, bool, Optional[str]]],
+        file_data: Dict[str, CacheEntry],
     ) -> None:
         """
         Save cache for the given configuration.
 
+        Only entries that differ from the cached ones are appended to the log.
+        Configurations that have not been saved for ``CACHE_MAX_AGE`` seconds
+        are evicted.
+
         Args:
             base_path: Base path that was scanned
             include_patterns: Include patterns used
             exclude_patterns: Exclude patterns used
-            file_data: Dictionary mapping file paths to (mtime, is_model, module_path)
+            file_data: Dictionary mapping file paths to
+                (mtime_ns, is_model, module_path, digest, size)
         """
         if not self.enabled:
             return
 
         try:
-            # Load existing cache file if it exists
-            if self.cache_file.exists():
-                with open(self.cache_file, encoding="utf-8") as f:
-                    all_caches = json.load(f)
-            else:
-                all_caches = {}
+            all_caches: Dict[str, Dict[str, CacheEntry]] = {}
+            saved_at: Dict[str, float] = {}
+            written: Optional[int] = None
+            size = 0
+            try:
+                log = self._read_log()
+                all_caches = dict(log.entries)
+                saved_at = dict(log.saved_at)
+                written = log.written
+                size = log.size
+            except FileNotFoundError:
+                pass
+            except (json.JSONDecodeError, KeyError, TypeError, ValueError, zlib.error):
+                # Unreadable or outdated log, start over with a fresh file
+                pass
 
-            # Update cache for this configuration
             cache_key = self._generate_cache_key(base_path, include_patterns, exclude_patterns)
+            previous = all_caches.get(cache_key)
 
-            # Convert to JSON-serializable format
-            cache_entry = {}
-            for file_path, (mtime, is_model, module_path) in file_data.items():
-                cache_entry[file_path] = {
-                    "mtime": mtime,
-                    "is_model": is_model,
-                    "module_path": module_path,
+            if previous is None:
+                changed = file_data
+                removed: List[str] = []
+            else:
+                changed = {
+                    file_path: entry
+                    for file_path, entry in file_data.items()
+                    if previous.get(file_path) != entry
                 }
+                removed = [file_path for file_path in previous if file_path not in file_data]
+
+            now = time.time()
+            last_saved = saved_at.get(cache_key, 0.0)
+            all_caches[cache_key] = dict(file_data)
+            saved_at[cache_key] = now
+
+            # Drop configurations that have not been scanned for a long time
+            stale = [key for key, when in saved_at.items() if when < now - CACHE_MAX_AGE]
+            for key in stale:
+                del all_caches[key], saved_at[key]
+            live = sum(len(entries) for entries in all_caches.values())
+
+            if stale or written is None or written + len(changed) + len(removed) > 2 * live:
+                # Rewrite the log with one record per configuration
+                data = CACHE_HEADER + b"".join(
+                    self._format_record(key, entries, [], saved_at[key])
+                    for key, entries in all_caches.items()
+                )
+                self._replace_log(data)
+                self._remember(_CacheLog(all_caches, saved_at, live, len(data)))
+                logger.info(
+                    "Compacted cache with %d entries, evicted %d configurations", live, len(stale)
+                )
+            elif previous is None or changed or removed or last_saved < now - CACHE_TOUCH_INTERVAL:
+                # A single write per record keeps concurrent appends from interleaving
+                record = self._format_record(cache_key, changed, removed, now)
+                with open(self.cache_file, "ab") as f:
+                    f.write(record)
+                self._remember(
+                    _CacheLog(
+                        all_caches,
+                        saved_at,
+                        written + len(changed) + len(removed),
+                        size + len(record),
+                    )
+                )
+                logger.info("Saved %d changed cache entries", len(changed) + len(removed))
+
+        except OSError as e:
+            logger.warning("Failed to save cache: %s", e)
 
-            all_caches[cache_key] = cache_entry
+    def _remember(self, log: _CacheLog) -> None:
+        """
+        Keep the log that was just written in memory so it is not read back.
 
-            # Write back to file
-            with open(self.cache_file, "w", encoding="utf-8") as f:
-                json.dump(all_caches, f, indent=2)
+        The memo is only kept if the file has exactly the size we expect,
+        otherwise another process wrote to it as well and it must be re-read.
+        """
+        self._memo = None
+        st = os.stat(self.cache_file)
+        if st.st_size == log.size:
+            self._memo = ((st.st_mtime_ns, st.st_size), log)
 
-            logger.info(f"Saved cache with {len(cache_entry)} entries")
+    def _replace_log(self, data: bytes) -> None:
+        """
+        Atomically replace the cache file with ``data``.
 
-        except OSError as e:
-            logger.warning(f"Failed to save cache: {e}")
+        The data is written to a temporary file next to the cache file and
+        renamed over it, so concurrent readers see either the old or the new
+        log and never a partially written one.
+        """
+        tmp_file = self.cache_file.with_name(f"{self.cache_file.name}.{os.getpid()}.tmp")
+        try:
+            with open(tmp_file, "wb") as f:
+                f.write(data)
+            os.replace(tmp_file, self.cache_file)
+        except OSError:
+            with contextlib.suppress(OSError):
+                tmp_file.unlink()
+            raise
+
+    @staticmethod
+    def _format_record(
+        cache_key: str,
+        entries: Dict[str, CacheEntry],
+        removed: List[str],
+        saved_at: float,
+    ) -> bytes:
+        """
+        Serialize one log record as a length-prefixed, compressed JSON document.
+
+        Entries are stored as parallel arrays rather than one object per file,
+        which avoids repeating the field names for every entry.
+        """
+        record = {
+            "key": cache_key,
+            "paths": list(entries),
+            "mtimes": [entry[0] for entry in entries.values()],
+            "is_model": [entry[1] for entry in entries.values()],
+            "module_paths": [entry[2] for entry in entries.values()],
+            "digests": [entry[3] for entry in entries.values()],
+            "sizes": [entry[4] for entry in entries.values()],
+            "removed": removed,
+            "saved_at": saved_at,
+        }
+        payload = zlib.compress(_dumps(record), COMPRESSION_LEVEL)
+        return RECORD_LENGTH.pack(len(payload)) + payload
 
     def invalidate(self) -> None:
         """Delete the cache file."""
+        self._memo = None
         if self.cache_file.exists():
             try:
                 self.cache_file.unlink()
                 logger.info("Cache invalidated")
             except OSError as e:
-                logger.warning(f"Failed to delete cache file: {e}")
+                logger.warning("Failed to delete cache file: %s", e)
 
     def is_file_modified(
         self,
-        file_path: Path,
-        cached_mtime: float,
+        file_path: Union[str, "os.PathLike[str]"],
+        cached_mtime_ns: int,
+        cached_size: Optional[int] = None,
     ) -> bool:
         """
         Check if a file has been modified since it was cached.
 
         Args:
             file_path: Path to the file
-            cached_mtime: Cached modification time
+            cached_mtime_ns: Cached modification time in nanoseconds, as stored in
+                the entries returned by ``load``
+            cached_size: Cached size in bytes, compared as well if given
 
         Returns:
             True if the file has been modified or doesn't exist
         """
         try:
-            current_mtime = file_path.stat().st_mtime
-            return current_mtime != cached_mtime
-        except (OSError, FileNotFoundError):
+            stat = os.stat(file_path)
+        except OSError:
             # File doesn't exist or can't be accessed
             return True
+        return stat.st_mtime_ns != cached_mtime_ns or (
+            cached_size is not None and stat.st_size != cached_size
+        )
+
+    def is_content_unchanged(
+        self,
+        file_path: Union[str, "os.PathLike[str]"],
+        cached_digest: Optional[str],
+    ) -> bool:
+        """
+        Check if a file still has the contents it had when it was cached.
+
+        Used when a file's modification time changed, to tell a real edit from
+        a file that was merely rewritten or touched.
+
+        Args:
+            file_path: Path to the file
+            cached_digest: Cached content digest, or None if unknown
+
+        Returns:
+            True if the file's contents match the cached digest
+        """
+        if cached_digest is None:
+            return False
+        try:
+            with open(file_path, "rb") as f:
+                return content_digest(f.read()) == cached_digest
+        except OSError:
+            return False
@@ -1,5 +1,6 @@
 import argparse
 import sys
+from typing import List, Optional
 
 from .config import load_config, setup_logging
 from .integration import get_project_root
@@ -43,9 +44,10 @@ def scan_command(args: argparse.Namespace) -> None:
         print(f"No SQLAlchemy models found in {config.base_path}")
         return
 
-    print(f"Discovered {len(modules)} model modules in {config.base_path}:")
-    for module in modules:
-        print(f"  - {module}")
+    # Write the whole listing at once rather than one print per module
+    lines = [f"Discovered {len(modules)} model modules in {config.base_path}:"]
+    lines.extend(f"  - {module}" for module in modules)
+    sys.stdout.write("\n".join(lines) + "\n")
 
 
 # Alias for backward compatibility
@@ -68,8 +70,8 @@ def check_command(args: argparse.Namespace) -> None:
     scan_command(args)
 
 
-def main() -> None:
-    """Main entry point for the CLI."""
+def main(argv: Optional[List[str]] = None) -> None:
+    """Main entry point for the CLI, parsing argv or else sys.argv[1:]."""
     parser = argparse.ArgumentParser(
         description="Automatically discover SQLAlchemy models for Alembic."
     )
@@ -135,7 +137,7 @@ def main() -> None:
     check_parser = subparsers.add_parser("check", help="[DEPRECATED] Use 'scan' instead")
     add_scan_args(check_parser)
 
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
 
     if args.command in ["scan", "discover"]:
         scan_command(args)
@@ -8,26 +8,87 @@ Supports loading configuration from multiple sources with priority:
 4. Defaults (lowest priority)
 """
 
+import copy
+import functools
 import logging
+import os
 import sys
+import time
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Union
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
 
 logger = logging.getLogger(__name__)
 
-# Try to import optional dependencies
-try:
-    import tomllib  # type: ignore # Python 3.11+
-except ImportError:
+
+# Optional dependencies are imported on first use so that importing this module
+# stays cheap when no configuration file is present.
+def _import_yaml() -> Any:
+    """Import PyYAML, returning None if it is not installed."""
+    try:
+        import yaml
+    except ImportError:
+        return None
+    return yaml
+
+
+def _import_tomllib() -> Any:
+    """Import tomllib (or the tomli backport), returning None if unavailable."""
     try:
-        import tomli as tomllib  # type: ignore # Fallback for Python 3.8-3.10
+        import tomllib  # type: ignore # Python 3.11+
     except ImportError:
-        tomllib = None  # type: ignore
+        try:
+            import tomli as tomllib  # type: ignore # Fallback for Python 3.8-3.10
+        except ImportError:
+            return None
+    return tomllib
+
 
-try:
-    import yaml
-except ImportError:
-    yaml = None  # type: ignore
+# Parsed configuration files keyed by (format, path), along with a fingerprint
+# of the raw bytes they were parsed from. Bounded, the oldest entry is evicted
+# once it is full.
+_parsed_configs: Dict[Tuple[str, str], Tuple[bytes, Any]] = {}
+_PARSED_CONFIGS_SIZE = 4096
+
+
+def _parse_config_file(config_path: Path, kind: str, parse: Callable[[bytes], Any]) -> Any:
+    """
+    Read a configuration file and parse it, reusing the previous result if unchanged.
+
+    The file is read once as bytes and fingerprinted with BLAKE2b. If the
+    fingerprint matches the last parse of the same file, parsing is skipped.
+    A deep copy is returned so callers cannot alter the memoised data.
+    """
+    import hashlib
+
+    with open(config_path, "rb") as f:
+        raw = f.read()
+
+    fingerprint = hashlib.blake2b(raw, digest_size=16).digest()
+    memo_key = (kind, str(config_path))
+    cached = _parsed_configs.get(memo_key)
+    if cached is not None and cached[0] == fingerprint:
+        return copy.deepcopy(cached[1])
+
+    data = parse(raw)
+    if memo_key not in _parsed_configs and len(_parsed_configs) >= _PARSED_CONFIGS_SIZE:
+        del _parsed_configs[next(iter(_parsed_configs))]
+    _parsed_configs[memo_key] = (fingerprint, data)
+    return copy.deepcopy(data)
+
+
+# Options understood by Config.from_dict
+_CONFIG_KEYS = frozenset(
+    (
+        "base_path",
+        "include_patterns",
+        "exclude_patterns",
+        "log_level",
+        "cache_enabled",
+        "parallel_enabled",
+        "parallel_threshold",
+        "strict_mode",
+    )
+)
 
 
 class Config:
@@ -93,6 +154,86 @@ class Config:
         )
 
 
+@functools.lru_cache(maxsize=64)
+def _walk_parents(start: str, max_depth: int) -> Tuple[Path, ...]:
+    """Return ``start`` and its parents, nearest first, limited to ``max_depth`` entries."""
+    current = Path(start)
+    return tuple([current, *current.parents][:max_depth])
+
+
+# Config file lookups keyed by (start, filenames, max_depth), along with the
+# directories listed and their mtimes. Creating, removing or renaming a file
+# updates its directory's mtime, so unchanged mtimes mean the same result.
+_config_lookups: Dict[
+    Tuple[str, Tuple[str, ...], int], Tuple[Tuple[Path, ...], Tuple[int, ...], Dict[str, Path]]
+] = {}
+
+# Directories modified this recently are not memoised, a change within the same
+# coarse filesystem clock tick would leave their mtime as it was
+_RACY_MTIME_NS = 2 * 10**9
+
+
+def _directory_mtimes(directories: Tuple[Path, ...]) -> Optional[Tuple[int, ...]]:
+    """Return the mtimes of ``directories`` in nanoseconds, or None if one cannot be stat-ed."""
+    try:
+        return tuple([os.stat(directory).st_mtime_ns for directory in directories])
+    except OSError:
+        return None
+
+
+def _find_config_files(
+    start_path: Optional[Path] = None,
+    filenames: Tuple[str, ...] = (".alembic-autoscan.yaml", "pyproject.toml"),
+    max_depth: int = 10,
+) -> Dict[str, Path]:
+    """
+    Find several configuration files in a single walk up the directory tree.
+
+    Each directory is listed once with ``os.scandir`` instead of stat-ing every
+    candidate filename separately, and the walk stops as soon as all files are found.
+    Repeated lookups only stat the listed directories while none of them changed.
+
+    Args:
+        start_path: Directory to start searching from
+        filenames: Configuration filenames to look for
+        max_depth: Maximum number of parent directories to check
+
+    Returns:
+        Mapping of filename to the nearest matching path, for the files that were found
+    """
+    start = str(start_path or Path.cwd())
+    memo_key = (start, tuple(filenames), max_depth)
+    cached = _config_lookups.get(memo_key)
+    if cached is not None and _directory_mtimes(cached[0]) == cached[1]:
+        return dict(cached[2])
+
+    wanted = set(filenames)
+    found: Dict[str, Path] = {}
+    listed: List[Path] = []
+
+    for parent in _walk_parents(start, max_depth):
+        listed.append(parent)
+        try:
+            with os.scandir(parent) as entries:
+                names = {entry.name for entry in entries if entry.name in wanted}
+        except OSError:
+            # Unlistable directory: fall back to checking each name directly
+            names = {name for name in wanted if (parent / name).exists()}
+
+        for name in names:
+            found[name] = parent / name
+            logger.debug(f"Found config file: {found[name]}")
+        wanted -= names
+        if not wanted:
+            break
+
+    directories = tuple(listed)
+    mtimes = _directory_mtimes(directories)
+    if mtimes and time.time_ns() - max(mtimes) > _RACY_MTIME_NS:
+        _config_lookups[memo_key] = (directories, mtimes, dict(found))
+    return found
+
+
 def _find_config_file(
     start_path: Optional[Path] = None,
     filename: str = ".alembic-autoscan.yaml",
@@ -109,33 +250,24 @@ def _find_config_file(
     Returns:
         Path to config file if found, None otherwise
     """
-    current = start_path or Path.cwd()
-
-    for i, parent in enumerate([current] + list(current.parents)):
-        if i >= max_depth:
-            break
-
-        config_path = parent / filename
-        if config_path.exists():
-            logger.debug(f"Found config file: {config_path}")
-            return config_path
-
-    return None
+    return _find_config_files(start_path, (filename,), max_depth).get(filename)
 
 
 def _load_yaml_config(config_path: Path) -> Dict[str, Any]:
     """Load configuration from YAML file."""
+    yaml = _import_yaml()
     if yaml is None:
         logger.warning(
             f"PyYAML not installed, cannot load {config_path}. Install with: pip install pyyaml"
         )
         return {}
 
+    # Prefer the libyaml based loader, PyYAML may be built without it
+    loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
     try:
-        with open(config_path, encoding="utf-8") as f:
-            data = yaml.safe_load(f)
-            logger.debug(f"Loaded YAML config from {config_path}")
-            return data or {}
+        data = _parse_config_file(config_path, "yaml", lambda raw: yaml.load(raw, Loader=loader))
+        logger.debug(f"Loaded YAML config from {config_path}")
+        return data or {}
     except Exception as e:
         logger.warning(f"Failed to load YAML config from {config_path}: {e}")
         return {}
@@ -143,6 +275,7 @@ def _load_yaml_config(config_path: Path) -> Dict[str, Any]:
 
 def _load_toml_config(config_path: Path) -> Dict[str, Any]:
     """Load configuration from pyproject.toml [tool.alembic-autoscan] section."""
+    tomllib = _import_tomllib()
     if tomllib is None:
         logger.warning(
             "tomli/tomllib not available, cannot load pyproject.toml configuration. "
@@ -151,16 +284,17 @@ def _load_toml_config(config_path: Path) -> Dict[str, Any]:
         return {}
 
     try:
-        with open(config_path, "rb") as f:
-            data = tomllib.load(f)
-            tool_dict = data.get("tool", {})
-            if isinstance(tool_dict, dict):
-                tool_config = tool_dict.get("alembic-autoscan", {})
-                if isinstance(tool_config, dict):
-                    if tool_config:
-                        logger.debug(f"Loaded TOML config from {config_path}")
-                    return tool_config
-            return {}
+        data = _parse_config_file(
+            config_path, "toml", lambda raw: tomllib.loads(raw.decode("utf-8"))
+        )
+        tool_dict = data.get("tool", {})
+        if isinstance(tool_dict, dict):
+            tool_config = tool_dict.get("alembic-autoscan", {})
+            if isinstance(tool_config, dict):
+                if tool_config:
+                    logger.debug(f"Loaded TOML config from {config_path}")
+                return tool_config
+        return {}
     except Exception as e:
         logger.warning(f"Failed to load TOML config from {config_path}: {e}")
         return {}
@@ -199,43 +333,48 @@ def load_config(
     Returns:
         Config object with merged configuration
     """
-    # Start with defaults
-    config_data: Dict[str, Any] = {}
-
-    # Try to find and load YAML config
-    if config_file:
-        config_path = Path(config_file)
-        if config_path.exists():
-            config_data.update(_load_yaml_config(config_path))
-    else:
-        yaml_path = _find_config_file(filename=".alembic-autoscan.yaml")
-        if yaml_path:
-            config_data.update(_load_yaml_config(yaml_path))
-
-    # Try to find and load TOML config (higher priority than YAML)
-    toml_path = _find_config_file(filename="pyproject.toml")
+    # Programmatic arguments (highest priority)
+    overrides = {
+        key: value
+        for key, value in (
+            ("base_path", base_path),
+            ("include_patterns", include_patterns),
+            ("exclude_patterns", exclude_patterns),
+            ("log_level", log_level),
+            ("cache_enabled", cache_enabled),
+            ("parallel_enabled", parallel_enabled),
+            ("parallel_threshold", parallel_threshold),
+            ("strict_mode", strict_mode),
+        )
+        if value is not None
+    }
+
+    # Locate both config files in a single walk up the directory tree
+    filenames: Tuple[str, ...] = ("pyproject.toml",)
+    if not config_file:
+        filenames = (".alembic-autoscan.yaml", *filenames)
+    found = _find_config_files(filenames=filenames)
+
+    # Load TOML config first, it takes priority over YAML
+    toml_data: Dict[str, Any] = {}
+    toml_path = found.get("pyproject.toml")
     if toml_path:
         toml_data = _load_toml_config(toml_path)
-        if toml_data:
-            config_data.update(toml_data)
-
-    # Override with programmatic arguments (highest priority)
-    if base_path is not None:
-        config_data["base_path"] = base_path
-    if include_patterns is not None:
-        config_data["include_patterns"] = include_patterns
-    if exclude_patterns is not None:
-        config_data["exclude_patterns"] = exclude_patterns
-    if log_level is not None:
-        config_data["log_level"] = log_level
-    if cache_enabled is not None:
-        config_data["cache_enabled"] = cache_enabled
-    if parallel_enabled is not None:
-        config_data["parallel_enabled"] = parallel_enabled
-    if parallel_threshold is not None:
-        config_data["parallel_threshold"] = parallel_threshold
-    if strict_mode is not None:
-        config_data["strict_mode"] = strict_mode
+
+    # Only parse YAML, and import PyYAML, if it can still contribute an option
+    config_data: Dict[str, Any] = {}
+    if not _CONFIG_KEYS.issubset(toml_data.keys() | overrides.keys()):
+        if config_file:
+            config_path = Path(config_file)
+            if config_path.exists():
+                config_data.update(_load_yaml_config(config_path))
+        else:
+            yaml_path = found.get(".alembic-autoscan.yaml")
+            if yaml_path:
+                config_data.update(_load_yaml_config(yaml_path))
+
+    config_data.update(toml_data)
+    config_data.update(overrides)
 
     return Config.from_dict(config_data)
 
@@ -4,7 +4,7 @@ Integration helpers for using alembic-autoscan with Alembic env.py.
 
 import os
 from pathlib import Path
-from typing import List, Optional
+from typing import List, Optional, Union
 
 from .scanner import ModelScanner
 
@@ -78,13 +78,16 @@ def import_models(
     return imported_count
 
 
-def get_project_root(marker_files: Optional[List[str]] = None) -> Path:
+def get_project_root(
+    marker_files: Optional[List[str]] = None, start: Optional[Union[str, Path]] = None
+) -> Path:
     """
     Find the project root directory by looking for marker files.
 
     Args:
         marker_files: List of files that indicate project root
                      (default: ["pyproject.toml", "setup.py", ".git"])
+        start: Directory to start searching from (default: current directory)
 
     Returns:
         Path to project root
@@ -99,16 +102,34 @@ def get_project_root(marker_files: Optional[List[str]] = None) -> Path:
     """
     if marker_files is None:
         marker_files = ["pyproject.toml", "setup.py", "setup.cfg", ".git"]
-
-    current = Path.cwd()
-
-    # Walk up the directory tree
-    for parent in [current] + list(current.parents):
-        for marker in marker_files:
-            if (parent / marker).exists():
-                return parent
-
-    # If no marker found, return current directory
+    # Plain names are matched against one listing per directory, markers with a
+    # separator such as "alembic/env.py" are looked up as paths
+    separators = tuple(sep for sep in ("/", os.sep, os.altsep) if sep)
+    nested = [m for m in marker_files if any(sep in m for sep in separators)]
+    markers = frozenset(marker_files).difference(nested)
+
+    # A relative start is made absolute, its parents would otherwise run out at ""
+    current = Path(os.path.abspath(os.fspath(start))) if start is not None else Path.cwd()
+
+    # Walk up the directory tree as plain strings, listing each directory once
+    directory = str(current)
+    while True:
+        found = False
+        if markers:
+            try:
+                with os.scandir(directory) as entries:
+                    found = any(entry.name in markers for entry in entries)
+            except OSError:
+                found = any(os.path.exists(os.path.join(directory, m)) for m in markers)
+        if found or any(os.path.exists(os.path.join(directory, m)) for m in nested):
+            return Path(directory)
+
+        parent = os.path.dirname(directory)
+        if parent == directory:
+            break
+        directory = parent
+
+    # If no marker found, return the start directory
     return current
 
 
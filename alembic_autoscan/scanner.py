@@ -3,17 +3,32 @@ Model scanner for discovering SQLAlchemy models in a codebase.
 """
 
 import ast
+import atexit
+import fnmatch
+import functools
 import importlib
 import importlib.util
 import logging
 import os
+import re
 import sys
-from concurrent.futures import ProcessPoolExecutor
-from multiprocessing import cpu_count
-from pathlib import Path
-from typing import List, Optional, Set, Tuple
-
-from .cache import ScanCache
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import cpu_count, get_all_start_methods, get_context
+from pathlib import Path, PurePath
+from typing import (
+    Any,
+    Dict,
+    FrozenSet,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Set,
+    Tuple,
+    Union,
+)
+
+from .cache import CacheEntry, ScanCache, content_digest
 from .utils import parse_gitignore
 
 logger = logging.getLogger(__name__)
@@ -21,6 +36,24 @@ logger = logging.getLogger(__name__)
 
 # --- AST Helper Functions (Standalone for Parallelization) ---
 
+# AST node classes bound at module level to save the ``ast.`` lookup per check.
+# Nodes produced by the parser are exact instances of these classes, so the
+# helpers compare ``type(node)`` against them instead of calling ``isinstance``.
+_AnnAssign = ast.AnnAssign
+_Assign = ast.Assign
+_Attribute = ast.Attribute
+_Call = ast.Call
+_ClassDef = ast.ClassDef
+_Constant = ast.Constant
+_Name = ast.Name
+_Subscript = ast.Subscript
+
+# Names recognised by the helpers below
+_COLUMN_FUNCTIONS = frozenset({"Column", "mapped_column"})
+_DECLARATIVE_DECORATORS = frozenset({"as_declarative", "declarative_base"})
+_MODEL_BASE_NAMES = frozenset({"Base", "DeclarativeBase", "Model"})
+_MODEL_BASE_ATTRIBUTES = frozenset({"Model", "DeclarativeBase"})
+
 
 def _is_sqlmodel(node: ast.ClassDef) -> bool:
     """Check if a class is a SQLModel with table=True."""
@@ -31,15 +64,15 @@ def _is_sqlmodel(node: ast.ClassDef) -> bool:
     has_sqlmodel_base = False
     for base in node.bases:
         # Check for SQLModel base class
-        if isinstance(base, ast.Name) and base.id == "SQLModel":
+        if type(base) is _Name and base.id == "SQLModel":
             has_sqlmodel_base = True
 
         # Check for SQLModel(..., table=True)
-        if isinstance(base, ast.Call):
-            if isinstance(base.func, ast.Name) and base.func.id == "SQLModel":
+        if type(base) is _Call:
+            if type(base.func) is _Name and base.func.id == "SQLModel":
                 # Check for table=True keyword argument
                 for keyword in base.keywords:
-                    if keyword.arg == "table" and isinstance(keyword.value, ast.Constant):
+                    if keyword.arg == "table" and type(keyword.value) is _Constant:
                         if keyword.value.value is True:
                             return True
 
@@ -47,179 +80,532 @@ def _is_sqlmodel(node: ast.ClassDef) -> bool:
     # as a keyword in the class definition
     if has_sqlmodel_base:
         for keyword in node.keywords:
-            if keyword.arg == "table" and isinstance(keyword.value, ast.Constant):
+            if keyword.arg == "table" and type(keyword.value) is _Constant:
                 if keyword.value.value is True:
                     return True
 
     return False
 
 
-def _is_abstract_class(node: ast.ClassDef) -> bool:
-    """Check if a class is marked as abstract."""
-    for item in node.body:
-        if isinstance(item, ast.Assign):
-            for target in item.targets:
-                if isinstance(target, ast.Name) and target.id == "__abstract__":
-                    # Check if the value is True
-                    if isinstance(item.value, ast.Constant):
-                        if item.value.value is True:
-                            return True
-    return False
-
-
 def _is_column_call(node: Optional[ast.AST]) -> bool:
     """Check if an AST node is a call to Column() or mapped_column()."""
-    if not isinstance(node, ast.Call):
+    if type(node) is not _Call:
         return False
 
     func = node.func
-    if isinstance(func, ast.Name):
-        return func.id in ["Column", "mapped_column"]
-    elif isinstance(func, ast.Attribute):
-        return func.attr in ["Column", "mapped_column"]
+    if type(func) is _Name:
+        return func.id in _COLUMN_FUNCTIONS
+    elif type(func) is _Attribute:
+        return func.attr in _COLUMN_FUNCTIONS
 
     return False
 
 
-def _is_sqlalchemy_model(node: ast.ClassDef) -> bool:
-    """Check if an AST class node represents a SQLAlchemy model."""
-    # Check for SQLModel with table=True
-    if _is_sqlmodel(node):
-        return True
-
+def _has_model_base(node: ast.ClassDef) -> bool:
+    """Check if a class is declared through a SQLAlchemy declarative base or decorator."""
     # Check decorators
     for decorator in node.decorator_list:
-        if isinstance(decorator, ast.Name):
-            if decorator.id in ["as_declarative", "declarative_base"]:
+        if type(decorator) is _Name:
+            if decorator.id in _DECLARATIVE_DECORATORS:
                 return True
-        elif isinstance(decorator, ast.Call):
-            if isinstance(decorator.func, ast.Name):
-                if decorator.func.id in ["as_declarative", "declarative_base"]:
+        elif type(decorator) is _Call:
+            if type(decorator.func) is _Name:
+                if decorator.func.id in _DECLARATIVE_DECORATORS:
                     return True
-            elif isinstance(decorator.func, ast.Attribute):
-                if decorator.func.attr in ["as_declarative", "declarative_base"]:
+            elif type(decorator.func) is _Attribute:
+                if decorator.func.attr in _DECLARATIVE_DECORATORS:
                     return True
 
-    if not node.bases:
-        return False
-
     for base in node.bases:
         # Direct inheritance: class User(Base)
-        if isinstance(base, ast.Name):
+        if type(base) is _Name:
             base_name = base.id
-            if base_name in ["Base", "DeclarativeBase", "Model"] or base_name.endswith("Base"):
+            if base_name in _MODEL_BASE_NAMES or base_name.endswith("Base"):
                 return True
 
         # Attribute access: class User(db.Model)
-        elif isinstance(base, ast.Attribute):
-            if base.attr in ["Model", "DeclarativeBase"] or base.attr.endswith("Base"):
+        elif type(base) is _Attribute:
+            if base.attr in _MODEL_BASE_ATTRIBUTES or base.attr.endswith("Base"):
                 return True
 
         # Function call: class User(declarative_base())
-        elif isinstance(base, ast.Call):
-            if isinstance(base.func, ast.Name):
+        elif type(base) is _Call:
+            if type(base.func) is _Name:
                 if base.func.id == "declarative_base":
                     return True
 
     return False
 
 
-def _has_table_definition(node: ast.ClassDef) -> bool:
-    """Check if a class has SQLAlchemy table indicators."""
-    if _is_sqlmodel(node):
-        return True
+def _scan_class_body(node: ast.ClassDef) -> Tuple[bool, bool, bool]:
+    """
+    Collect the table indicators of a class in a single pass over its body.
+
+    Returns:
+        Tuple of (is_abstract, has_tablename, has_table_definition), where a
+        table definition is ``__tablename__``, ``__table__``, a ``Mapped[...]``
+        annotation or a ``Column()``/``mapped_column()`` assignment
+    """
+    has_tablename = False
+    has_table = False
 
     for item in node.body:
-        # Check for __tablename__ or __table__
-        if isinstance(item, ast.Assign):
+        if type(item) is _Assign:
             for target in item.targets:
-                if isinstance(target, ast.Name):
-                    if target.id in ["__tablename__", "__table__"]:
-                        return True
+                if type(target) is _Name:
+                    if target.id == "__abstract__":
+                        if type(item.value) is _Constant and item.value.value is True:
+                            return True, False, False
+                    elif target.id == "__tablename__":
+                        has_tablename = True
+                        has_table = True
+                    elif target.id == "__table__":
+                        has_table = True
+
+            if _is_column_call(item.value):
+                has_table = True
 
-        # Check for Column definitions or Mapped annotations
-        if isinstance(item, ast.AnnAssign):
+        elif type(item) is _AnnAssign:
             # Check for Mapped[int]
-            if isinstance(item.annotation, ast.Subscript):
-                if isinstance(item.annotation.value, ast.Name):
-                    if item.annotation.value.id == "Mapped":
-                        return True
+            annotation = item.annotation
+            if type(annotation) is _Subscript:
+                if type(annotation.value) is _Name and annotation.value.id == "Mapped":
+                    has_table = True
 
             # Check for mapped_column() or Column() in the value
-            value = getattr(item, "value", None)
-            if value is not None and _is_column_call(value):
-                return True
+            if item.value is not None and _is_column_call(item.value):
+                has_table = True
+
+    return False, has_tablename, has_table
+
+
+# Statement lists of each node type that can hold a class definition. Classes
+# are statements, so they only ever appear in these lists and never inside
+# expressions; ``TryStar`` and ``Match`` only exist on newer Python versions.
+_BLOCK_FIELDS = {
+    getattr(ast, name): fields
+    for name, fields in (
+        ("Module", ("body",)),
+        ("ClassDef", ("body",)),
+        ("FunctionDef", ("body",)),
+        ("AsyncFunctionDef", ("body",)),
+        ("If", ("body", "orelse")),
+        ("For", ("body", "orelse")),
+        ("AsyncFor", ("body", "orelse")),
+        ("While", ("body", "orelse")),
+        ("With", ("body",)),
+        ("AsyncWith", ("body",)),
+        ("Try", ("body", "handlers", "orelse", "finalbody")),
+        ("TryStar", ("body", "handlers", "orelse", "finalbody")),
+        ("ExceptHandler", ("body",)),
+        ("Match", ("cases",)),
+        ("match_case", ("body",)),
+    )
+    if hasattr(ast, name)
+}
+
+
+def _iter_class_defs(tree: ast.AST) -> Iterator[ast.ClassDef]:
+    """
+    Yield every class definition in a tree in source order, including nested ones.
 
-        if isinstance(item, ast.Assign):
-            if _is_column_call(item.value):
-                return True
+    Only statement lists are descended into, so the expressions that make up
+    most of a module are never visited.
+    """
+    stack = [tree]
+    while stack:
+        node = stack.pop()
+        fields = _BLOCK_FIELDS.get(type(node))
+        if fields is None:
+            continue
+        if type(node) is _ClassDef:
+            yield node
+        # Pushed in reverse so that classes come out in source order
+        for field in reversed(fields):
+            stack.extend(reversed(getattr(node, field)))
+
+
+def _is_map_imperatively_call(node: ast.AST) -> bool:
+    """Check if an AST node is a call to map_imperatively()."""
+    if type(node) is not _Call:
+        return False
+
+    func = node.func
+    if type(func) is _Attribute:
+        return func.attr == "map_imperatively"
+    elif type(func) is _Name:
+        return func.id == "map_imperatively"
 
     return False
 
 
-def _has_tablename(node: ast.ClassDef) -> bool:
-    """Check if a class has __tablename__ defined."""
-    for item in node.body:
-        if isinstance(item, ast.Assign):
-            for target in item.targets:
-                if isinstance(target, ast.Name) and target.id == "__tablename__":
-                    return True
-    return False
+# Identifiers that every model, abstract base or imperative mapping must contain
+# somewhere in its source; files without any of them are never parsed
+_MODEL_MARKERS = (
+    b"__tablename__",
+    b"__table__",
+    b"__abstract__",
+    b"SQLModel",
+    b"Mapped",
+    b"Column",
+    b"mapped_column",
+    b"map_imperatively",
+)
+
+
+# Digest of an empty file, recorded for empty files without reading them
+_EMPTY_DIGEST = content_digest(b"")
+
+# Flags making compile() return the module AST, as ast.parse does, without the
+# wrapper call and without inheriting this module's future flags
+_AST_ONLY_FLAGS = ast.PyCF_ONLY_AST
+
+
+def _parse_source(source: str, filename: str) -> ast.Module:
+    """Parse Python source into its module AST."""
+    tree: ast.Module = compile(source, filename, "exec", _AST_ONLY_FLAGS, dont_inherit=True)
+    return tree
+
+
+# Result of scanning one file: (file_path, is_model, abstract_class_names, content_digest)
+ScanResult = Tuple[str, bool, Tuple[str, ...], Optional[str]]
+
+
+# Scan results of this process keyed by (file_path, mtime_ns, size, collect_abstracts),
+# shared by every scanner whatever its patterns or cache setting, oldest evicted first
+_SCAN_MEMO_SIZE = 4096
+_scan_memo: Dict[Tuple[str, int, int, bool], ScanResult] = {}
+
+# (is_model, abstract_class_names) of the sources parsed by this process, keyed by
+# (content_digest, collect_abstracts), so identical copies of a file are parsed once
+_parse_memo: Dict[Tuple[str, bool], Tuple[bool, Tuple[str, ...]]] = {}
+
 
+def _memoise(memo: Dict[Any, Any], key: Any, value: Any) -> None:
+    """Add an entry to a bounded memo, evicting its oldest entry when full."""
+    if len(memo) >= _SCAN_MEMO_SIZE:
+        del memo[next(iter(memo))]
+    memo[key] = value
 
-def scan_file_worker(file_path: Path) -> Tuple[Path, bool, List[str]]:
+
+def scan_file_worker(file_path: str, collect_abstracts: bool = True) -> ScanResult:
     """
     Scan a Python file for SQLAlchemy models using AST.
 
+    Paths travel as plain strings and results as plain tuples, which are much
+    cheaper to pickle between processes than ``Path`` objects and lists.
+
+    Args:
+        file_path: Path of the file to scan
+        collect_abstracts: If False, stop at the first concrete model instead of
+            going on to collect the names of later abstract classes
+
+    Returns:
+        Tuple of (file_path, is_model, abstract_class_names, content_digest),
+        the digest being None if the file could not be read
+    """
+    try:
+        with open(file_path, "rb") as f:
+            data = f.read()
+    except OSError:
+        # Skip files that can't be read
+        return file_path, False, (), None
+
+    return scan_source(data, file_path, collect_abstracts)
+
+
+def scan_source(data: bytes, file_path: str, collect_abstracts: bool = True) -> ScanResult:
+    """
+    Scan the contents of a Python file for SQLAlchemy models using AST.
+
+    Args:
+        data: Raw contents of the file
+        file_path: Path the contents were read from, reported back and used in
+            syntax errors
+        collect_abstracts: If False, stop at the first concrete model instead of
+            going on to collect the names of later abstract classes
+
     Returns:
-        Tuple of (file_path, is_model, list_of_abstract_classes)
+        Tuple of (file_path, is_model, abstract_class_names, content_digest)
     """
-    abstract_classes = []
+    abstract_classes: List[str] = []
     has_concrete_model = False
+    digest = content_digest(data)
 
     try:
-        with open(file_path, encoding="utf-8") as f:
-            content = f.read()
-
-        tree = ast.parse(content, filename=str(file_path))
-
-        # Look for class definitions and imperative mapping calls
-        for node in ast.walk(tree):
-            if isinstance(node, ast.ClassDef):
-                # Check if it's abstract first
-                if _is_abstract_class(node):
-                    abstract_classes.append(node.name)
-                    continue  # Skip abstract classes
-
-                # Check if it's a SQLAlchemy model
-                is_model = _is_sqlalchemy_model(node)
-                has_table = _has_table_definition(node)
-
-                if _has_tablename(node):
-                    has_concrete_model = True
-                elif _is_sqlmodel(node):
-                    has_concrete_model = True
-                elif is_model and has_table:
-                    has_concrete_model = True
-
-            # Check for imperative mapping
-            if isinstance(node, ast.Call):
-                func = node.func
-                if isinstance(func, ast.Attribute):
-                    if func.attr == "map_imperatively":
-                        has_concrete_model = True
-                elif isinstance(func, ast.Name):
-                    if func.id == "map_imperatively":
-                        has_concrete_model = True
-
-        return file_path, has_concrete_model, abstract_classes
-
-    except (SyntaxError, UnicodeDecodeError, OSError):
-        # Skip files that can't be parsed or read
-        return file_path, False, []
+        # Files that never mention a model indicator cannot be models, skip parsing them
+        if not any(marker in data for marker in _MODEL_MARKERS):
+            return file_path, False, (), digest
+
+        parsed = _parse_memo.get((digest, collect_abstracts))
+        if parsed is not None:
+            return file_path, parsed[0], parsed[1], digest
+
+        tree = _parse_source(data.decode("utf-8"), str(file_path))
+
+        # Look for class definitions. Once a concrete model is found only
+        # abstract classes are still collected, if they are wanted at all.
+        for node in _iter_class_defs(tree):
+            # Check if it's abstract first
+            is_abstract, has_tablename, has_table = _scan_class_body(node)
+            if is_abstract:
+                abstract_classes.append(node.name)
+                continue  # Skip abstract classes
+
+            if has_concrete_model:
+                continue
+
+            if has_tablename or _is_sqlmodel(node):
+                has_concrete_model = True
+            elif has_table and _has_model_base(node):
+                has_concrete_model = True
+
+            if has_concrete_model and not collect_abstracts:
+                break
+
+        # Check for imperative mapping, whose calls may sit in any expression,
+        # only walking the whole tree when the source mentions it at all
+        if not has_concrete_model and b"map_imperatively" in data:
+            has_concrete_model = any(_is_map_imperatively_call(node) for node in ast.walk(tree))
+
+        abstracts = tuple(abstract_classes)
+        _memoise(_parse_memo, (digest, collect_abstracts), (has_concrete_model, abstracts))
+        return file_path, has_concrete_model, abstracts, digest
+
+    except (SyntaxError, UnicodeDecodeError):
+        # Skip files that can't be parsed
+        return file_path, False, (), digest
     except Exception as e:
         logger.debug(f"Error scanning {file_path}: {e}")
-        return file_path, False, []
+        return file_path, False, (), digest
+
+
+def _is_module_part(part: str) -> bool:
+    """Check if a path segment can be part of a dotted module path."""
+    # Filter out segments that start with a dot (except for current/parent dir
+    # which shouldn't be here) or contain invalid characters for Python identifiers.
+    if part.startswith(".") and part != "." and part != "..":
+        return False
+    # Check if it's a valid identifier.
+    # Note: some legitimate packages might have dashes or other chars if they use
+    # non-standard layouts, but for models it's almost always valid identifiers.
+    return part.isidentifier()
+
+
+# --- Worker Pool ---
+
+# Pool shared by every scanner in the process, created on first parallel scan
+_executor: Optional[Executor] = None
+
+
+def _gil_disabled() -> bool:
+    """Check if running on a free-threaded CPython build with the GIL disabled."""
+    is_gil_enabled = getattr(sys, "_is_gil_enabled", None)
+    return is_gil_enabled is not None and not is_gil_enabled()
+
+
+def _get_executor() -> Executor:
+    """
+    Return the shared worker pool, creating it on first use.
+
+    Threads are used when the GIL is disabled since parsing then runs truly in
+    parallel without pickling files and results across processes; otherwise
+    a process pool is used. The pool is kept for later scans and shut down at exit.
+
+    Worker processes are forked where the platform allows it: spawned or fork
+    server workers re-import ``__main__``, which re-runs an unguarded script
+    such as a migration ``env.py`` once per worker.
+    """
+    global _executor
+    if _executor is None:
+        max_workers = cpu_count() or 1
+        if _gil_disabled():
+            _executor = ThreadPoolExecutor(max_workers=max_workers)
+        else:
+            method = (
+                "fork" if "fork" in get_all_start_methods() and sys.platform != "darwin" else None
+            )
+            _executor = ProcessPoolExecutor(max_workers=max_workers, mp_context=get_context(method))
+        atexit.register(_executor.shutdown)
+    return _executor
+
+
+def _discard_executor() -> None:
+    """Shut down the shared worker pool, e.g. after it broke, so the next scan starts afresh."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False)
+        _executor = None
+
+
+# --- Pattern Matching Helpers ---
+
+
+# Path separator and newline swapped, so that each path component sits on its
+# own line and a regex wildcard, which does not match newlines, stays in it
+_SWAP_SEP_AND_NEWLINE = str.maketrans({os.sep: "\n", "\n": os.sep})
+
+# Prefix and suffix ``fnmatch.translate`` wraps around every translated pattern
+_FNMATCH_PREFIX, _FNMATCH_SUFFIX = fnmatch.translate("_").split("_")
+_FNMATCH_SLICE = slice(len(_FNMATCH_PREFIX), -len(_FNMATCH_SUFFIX))
+
+# Pathlib compares paths case-insensitively where the OS does
+_PATH_CASE_FLAGS = 0 if os.path.normcase("Aa") == "Aa" else re.IGNORECASE
+
+
+class _CompiledPattern(NamedTuple):
+    """A glob pattern with every variant tried by ``ModelScanner._matches_pattern``."""
+
+    pattern: str
+    full_regex: str
+    part_names: Tuple[str, ...]
+    suffix: Optional[str]
+    tail: Optional[str]
+    simplified: Optional[str]
+    simplified_regex: Optional[str]
+    simplified_tail: Optional[str]
+
+
+class _PatternSet(NamedTuple):
+    """
+    A list of glob patterns folded into combined matchers.
+
+    A path is tested against every pattern at once: one set lookup for the
+    directory names, one ``str.endswith`` for patterns like ``**/*.py``, one
+    regex for all the fnmatch variants and one regex for all the pathlib variants
+    of the remaining patterns.
+    """
+
+    part_names: FrozenSet[str]
+    suffixes: Tuple[str, ...]
+    fnmatch_regex: Optional["re.Pattern[str]"]
+    lines_regex: Optional["re.Pattern[str]"]
+
+
+def _path_lines(path: Union[str, PurePath]) -> str:
+    """Render a path with one component per line, as matched by ``_pathlib_regex``."""
+    path_str = str(path)
+    return "" if path_str == "." else path_str.translate(_SWAP_SEP_AND_NEWLINE)
+
+
+@functools.lru_cache(maxsize=512)
+def _pathlib_regex(pattern: str) -> str:
+    """
+    Translate a pattern into a regex that matches like ``PurePath.match``.
+
+    The regex is searched for in a path rendered by ``_path_lines``. A relative
+    pattern matches the path's trailing components, each component through
+    fnmatch, while an anchored pattern must match the whole path.
+
+    Raises:
+        ValueError: If the pattern is empty
+    """
+    path_pattern = PurePath(pattern)
+    if not path_pattern.parts:
+        raise ValueError("empty pattern")
+
+    parts = [r"\A" if path_pattern.anchor else "^"]
+    for part in _path_lines(path_pattern).splitlines(keepends=True):
+        if part == "*\n":
+            parts.append(r".+\n")
+        elif part == "*":
+            parts.append(".+")
+        else:
+            parts.append(fnmatch.translate(part)[_FNMATCH_SLICE])
+    parts.append(r"\Z")
+    return "".join(parts)
+
+
+def _fnmatch_regex(pattern: str) -> str:
+    """Translate a pattern into the regex ``fnmatch.fnmatch`` would use."""
+    return fnmatch.translate(os.path.normcase(pattern))
+
+
+def _compile_any(regexes: List[str], flags: int = 0) -> Optional["re.Pattern[str]"]:
+    """Compile regexes into a single regex that matches wherever any of them does."""
+    if not regexes:
+        return None
+    return re.compile("|".join(f"(?:{regex})" for regex in regexes), flags)
+
+
+@functools.lru_cache(maxsize=512)
+def _compile_pattern(pattern: str) -> _CompiledPattern:
+    """
+    Derive the normalized forms of a glob pattern once instead of on every match.
+
+    Memoised per pattern as well as per set, since different sets share most
+    patterns, e.g. the defaults extended by each project's .gitignore.
+    """
+    norm_pattern = pattern.replace(os.sep, "/")
+
+    part_names = []
+    if "/" not in norm_pattern and "*" not in norm_pattern:
+        part_names.append(norm_pattern)
+
+    # "*.py" and "**/*.py" match exactly the paths ending in ".py", both as an
+    # fnmatch pattern and as a pathlib one, so a suffix check replaces the regexes
+    suffix = None
+    name_pattern = norm_pattern[3:] if norm_pattern.startswith("**/") else norm_pattern
+    if name_pattern.startswith("*") and not any(c in name_pattern[1:] for c in "*?[/"):
+        suffix = os.path.normcase(name_pattern[1:]) or None
+
+    tail = simplified = simplified_tail = None
+    if "**" in norm_pattern:
+        clean_pattern = norm_pattern.replace("**/", "").replace("/**", "").strip("/")
+        if clean_pattern and "/" not in clean_pattern and "*" not in clean_pattern:
+            part_names.append(clean_pattern)
+        if norm_pattern.startswith("**/"):
+            tail = norm_pattern[3:]
+        if "/**/" in norm_pattern:
+            simplified = norm_pattern.replace("/**/", "/")
+            if simplified.startswith("**/"):
+                simplified_tail = simplified[3:]
+
+    return _CompiledPattern(
+        pattern=pattern,
+        full_regex=_fnmatch_regex(norm_pattern),
+        part_names=tuple(part_names),
+        suffix=suffix,
+        tail=tail,
+        simplified=simplified,
+        simplified_regex=None if simplified is None else _fnmatch_regex(simplified),
+        simplified_tail=simplified_tail,
+    )
+
+
+@functools.lru_cache(maxsize=64)
+def _compile_patterns(patterns: Tuple[str, ...]) -> _PatternSet:
+    """Compile a list of glob patterns, memoised across calls and scanners."""
+    compiled = [_compile_pattern(pattern) for pattern in patterns]
+    suffixes = tuple(dict.fromkeys(c.suffix for c in compiled if c.suffix is not None))
+    compiled = [c for c in compiled if c.suffix is None]
+    fnmatch_regexes = [
+        regex for c in compiled for regex in (c.full_regex, c.simplified_regex) if regex is not None
+    ]
+    path_patterns = [
+        variant
+        for c in compiled
+        for variant in (c.pattern, c.tail, c.simplified, c.simplified_tail)
+        if variant is not None
+    ]
+    return _PatternSet(
+        part_names=frozenset(name for c in compiled for name in c.part_names),
+        suffixes=suffixes,
+        fnmatch_regex=_compile_any(list(dict.fromkeys(fnmatch_regexes))),
+        lines_regex=_compile_any(
+            [_pathlib_regex(pattern) for pattern in dict.fromkeys(path_patterns)],
+            re.MULTILINE | _PATH_CASE_FLAGS,
+        ),
+    )
+
+
+# Modification times this close to the epoch were reset, e.g. by Nix or a
+# reproducible build, and say nothing about whether a file changed
+_UNRELIABLE_MTIME_NS = 24 * 60 * 60 * 10**9
+
+# Files larger than this are assumed to be generated or vendored code and are
+# not parsed, parsing them could take seconds each
+MAX_FILE_BYTES = 2 * 1024 * 1024
 
 
 class ModelScanner:
@@ -255,6 +641,9 @@ class ModelScanner:
         parallel_enabled: Optional[bool] = None,
         parallel_threshold: int = 50,
         strict_mode: bool = False,
+        max_file_bytes: Optional[int] = MAX_FILE_BYTES,
+        collect_abstracts: bool = True,
+        strict_hash: bool = False,
     ):
         """
         Initialize the ModelScanner.
@@ -267,16 +656,28 @@ class ModelScanner:
             parallel_enabled: Whether to enable parallel scanning (None=auto)
             parallel_threshold: Minimum files for parallel scanning
             strict_mode: If True, verify imports during discovery
+            max_file_bytes: Size above which files are skipped unread (None=no limit)
+            collect_abstracts: Whether to record abstract class names, disable to
+                stop scanning each file at its first concrete model
+            strict_hash: If True, compare the contents of every cached file instead
+                of trusting an unchanged mtime and size
         """
         self.base_path = Path(base_path).resolve()
+        # Resolved base path with a trailing separator, for slicing paths below it
+        self._base_prefix = os.path.join(str(self.base_path), "")
         self.include_patterns = include_patterns or ["**/*.py"]
         self.exclude_patterns = (exclude_patterns or []) + self.DEFAULT_EXCLUDE_PATTERNS
         self.cache_enabled = cache_enabled
         self.parallel_enabled = parallel_enabled
         self.parallel_threshold = parallel_threshold
         self.strict_mode = strict_mode
+        self.max_file_bytes = max_file_bytes
+        self.collect_abstracts = collect_abstracts
+        self.strict_hash = strict_hash
         self._discovered_modules: Set[str] = set()
         self._abstract_classes: Set[str] = set()
+        # Module path parts of each resolved directory, or None if it is not importable
+        self._directory_parts: Dict[str, Optional[Tuple[str, ...]]] = {}
 
         # Initialize cache
         self.cache = ScanCache(cache_dir=self.base_path, enabled=cache_enabled)
@@ -287,97 +688,154 @@ class ModelScanner:
         if gitignore_patterns:
             self.exclude_patterns.extend(gitignore_patterns)
 
-    def _matches_pattern(self, path: Path, patterns: List[str]) -> bool:
-        """Check if a path matches any of the given glob patterns."""
+    def _must_verify_content(self, mtime: int) -> bool:
+        """Check if a file's unchanged mtime and size are not enough to trust its cached result."""
+        return self.strict_hash or mtime < _UNRELIABLE_MTIME_NS
+
+    def _relative_path(self, path: Path) -> Path:
+        """Express an absolute path relative to the base path, for pattern matching."""
         try:
             if path.is_absolute():
-                path_to_match = path.resolve().relative_to(self.base_path.resolve())
-            else:
-                path_to_match = path
+                # base_path is resolved once in __init__
+                return path.resolve().relative_to(self.base_path)
         except (ValueError, OSError):
-            path_to_match = path
+            pass
+        return path
 
-        path_str = str(path_to_match).replace(os.sep, "/")
-        parts = path_to_match.parts
-
-        for pattern in patterns:
-            # 1. Try standard pathlib match
-            if path_to_match.match(pattern):
-                return True
-
-            # 2. Try matching against the full relative path string using fnmatch
-            norm_pattern = pattern.replace(os.sep, "/")
-            import fnmatch
-
-            if fnmatch.fnmatch(path_str, norm_pattern):
-                return True
-
-            # 3. Handle directory-only patterns like "venv" or "tests"
-            if "/" not in norm_pattern and "*" not in norm_pattern:
-                if norm_pattern in parts:
-                    return True
+    def _matches_pattern(self, path: Path, patterns: List[str]) -> bool:
+        """Check if a path matches any of the given glob patterns."""
+        return self._matches_relative(str(self._relative_path(path)), patterns)
 
-            # 4. Handle patterns like **/dir/** or **/dir
-            if "**" in norm_pattern:
-                clean_pattern = norm_pattern.replace("**/", "").replace("/**", "").strip("/")
-                if clean_pattern and "/" not in clean_pattern and "*" not in clean_pattern:
-                    if clean_pattern in parts:
-                        return True
-
-                # Fallback for start-with **/
-                if norm_pattern.startswith("**/"):
-                    if path_to_match.match(norm_pattern[3:]):
-                        return True
-
-                # Simplify globstars for matching
-                if "/**/" in norm_pattern:
-                    simplified = norm_pattern.replace("/**/", "/")
-                    if path_to_match.match(simplified) or fnmatch.fnmatch(path_str, simplified):
-                        return True
-                    if simplified.startswith("**/") and path_to_match.match(simplified[3:]):
-                        return True
+    def _matches_relative(self, path_to_match: str, patterns: List[str]) -> bool:
+        """
+        Check if a path, already made relative to the base path, matches any pattern.
 
-        return False
+        The path is a normalized string with native separators, so walked files
+        are matched without building a ``Path`` for each of them.
+        """
+        path_str = os.path.normcase(path_to_match.replace(os.sep, "/"))
+        pattern_set = _compile_patterns(tuple(patterns))
+
+        # Directory-only patterns like "venv" or "tests", and patterns like
+        # **/dir/** or **/dir, match on any path component
+        if not pattern_set.part_names.isdisjoint(path_to_match.split(os.sep)):
+            return True
+
+        # Patterns like *.py or **/*.py only need a suffix check
+        if pattern_set.suffixes and path_str.endswith(pattern_set.suffixes):
+            return True
+
+        # Match the full relative path string using fnmatch, both as written
+        # and with globstars simplified
+        if pattern_set.fnmatch_regex is not None and pattern_set.fnmatch_regex.match(path_str):
+            return True
+
+        # Standard pathlib match, with the **/ prefix dropped and globstars simplified
+        return (
+            pattern_set.lines_regex is not None
+            and pattern_set.lines_regex.search(_path_lines(path_to_match)) is not None
+        )
 
     def _should_scan_file(self, file_path: Path) -> bool:
         """Determine if a file should be scanned based on include/exclude patterns."""
-        if not self._matches_pattern(file_path, self.include_patterns):
+        return self._should_scan_relative(str(self._relative_path(file_path)))
+
+    def _should_scan_relative(self, relative_path: str) -> bool:
+        """Apply the include/exclude patterns to a path already relative to the base path."""
+        if not self._matches_relative(relative_path, self.include_patterns):
             return False
-        if self._matches_pattern(file_path, self.exclude_patterns):
+        if self._matches_relative(relative_path, self.exclude_patterns):
             return False
         return True
 
+    def _resolve_entry(self, dir_entry: "os.DirEntry[str]") -> Tuple[str, str]:
+        """
+        Resolve a walked file to its canonical path and its path relative to the base path.
+
+        The walk starts from the resolved base path and never follows symlinked
+        directories, so only a symlinked file needs ``resolve()``. Any other
+        entry path is canonical already and is made relative by slicing.
+        """
+        if dir_entry.is_symlink():
+            file_path = Path(dir_entry.path)
+            return str(file_path.resolve()), str(self._relative_path(file_path))
+
+        return dir_entry.path, dir_entry.path[len(self._base_prefix) :]
+
+    def _iter_python_files(self) -> Iterator["os.DirEntry[str]"]:
+        """
+        Walk the base path for Python files, pruning excluded directories.
+
+        Yields directory entries rather than paths so that callers can reuse the
+        stat information the entry caches (free on Windows).
+
+        A directory whose name is excluded outright, e.g. by ``**/node_modules/**``
+        or a bare ``venv`` pattern, is not descended into since every file below
+        it would be excluded anyway. Symlinked directories are not followed.
+        """
+        pruned_names = _compile_patterns(tuple(self.exclude_patterns)).part_names
+
+        stack = [str(self.base_path)]
+        while stack:
+            directory = stack.pop()
+            try:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        if entry.is_dir(follow_symlinks=False):
+                            if entry.name not in pruned_names:
+                                stack.append(entry.path)
+                        elif os.path.normcase(entry.name).endswith(".py") and entry.is_file():
+                            yield entry
+            except OSError:
+                # Unreadable directory, skip it like rglob does
+                continue
+
     def _get_module_path(self, file_path: Path) -> Optional[str]:
         """Convert a file path to a Python module path."""
         try:
-            abs_file_path = file_path.resolve()
-            rel_path = abs_file_path.relative_to(self.base_path.resolve())
-            if rel_path.suffix == ".py":
-                rel_path = rel_path.with_suffix("")
+            return self._module_path_from_resolved(str(file_path.resolve()))
+        except OSError:
+            return None
 
-            parts = list(rel_path.parts)
+    def _module_path_from_resolved(self, path_str: str) -> Optional[str]:
+        """
+        Convert an already resolved file path string to a Python module path.
 
-            if parts[-1] == "__init__":
-                parts = parts[:-1]
+        Works on the string directly, without resolving the path again or
+        building intermediate ``Path`` objects. The parts of each directory are
+        derived once and shared by every file in it.
+        """
+        directory, _, name = path_str.rpartition(os.sep)
+        try:
+            parts = self._directory_parts[directory]
+        except KeyError:
+            parts = self._directory_parts[directory] = self._module_parts_of(directory)
+        if parts is None:
+            return None
 
-            if not parts:
+        if name.endswith(".py"):
+            name = name[:-3]
+        if name != "__init__":
+            if not _is_module_part(name):
                 return None
+            parts += (name,)
 
-            # Filter out segments that start with a dot (except for current/parent dir
-            # which shouldn't be here) or contain invalid characters for Python identifiers.
-            for part in parts:
-                if part.startswith(".") and part != "." and part != "..":
-                    return None
-                # Check if it's a valid identifier.
-                # Note: some legitimate packages might have dashes or other chars if they use
-                # non-standard layouts, but for models it's almost always valid identifiers.
-                if not part.isidentifier() and part != "__init__":
-                    return None
-
-            return ".".join(parts)
-        except (ValueError, OSError):
+        if not parts:
+            return None
+
+        return ".".join(parts)
+
+    def _module_parts_of(self, directory: str) -> Optional[Tuple[str, ...]]:
+        """Split a resolved directory below the base path into module path parts."""
+        directory += os.sep
+        if not os.path.normcase(directory).startswith(os.path.normcase(self._base_prefix)):
             return None
 
+        parts = tuple(directory[len(self._base_prefix) :].split(os.sep)[:-1])
+        if not all(_is_module_part(part) for part in parts):
+            return None
+        return parts
+
     def discover(self) -> List[str]:
         """
         Discover all SQLAlchemy model modules in the codebase.
@@ -388,11 +846,18 @@ class ModelScanner:
         self._discovered_modules.clear()
         self._abstract_classes.clear()
 
-        # Step 1: Collect all files to scan
-        files_to_check = []
-        for file_path in self.base_path.rglob("*.py"):
-            if self._should_scan_file(file_path):
-                files_to_check.append(file_path)
+        # Step 1: Collect all files to scan, stat-ing each file exactly once
+        files_to_check: List[Tuple[str, int, int]] = []
+        for dir_entry in self._iter_python_files():
+            try:
+                path_str, relative_path = self._resolve_entry(dir_entry)
+                if not self._should_scan_relative(relative_path):
+                    continue
+                stat = dir_entry.stat()
+            except OSError:
+                # Removed since the directory was listed
+                continue
+            files_to_check.append((path_str, stat.st_mtime_ns, stat.st_size))
 
         # Step 2: Load cache
         cache_data = (
@@ -400,34 +865,57 @@ class ModelScanner:
         )
 
         # Step 3: Determine which files need scanning vs can be served from cache
-        files_to_scan = []
-        new_cache_data = {}  # Store updated cache info
-
-        for file_path in files_to_check:
-            path_str = str(file_path.resolve())
-
-            # Check if file needs rescanning
-            needs_rescan = True
-            if path_str in cache_data:
-                mtime, is_model, module_path = cache_data[path_str]
-                if not self.cache.is_file_modified(file_path, mtime):
-                    needs_rescan = False
-                    # Use cached result
-                    if is_model:
-                        new_cache_data[path_str] = (mtime, True, module_path)
-                        if module_path:
-                            self._discovered_modules.add(module_path)
-                    else:
-                        new_cache_data[path_str] = (mtime, False, None)
-
-            if needs_rescan:
-                files_to_scan.append(file_path)
+        files_to_scan = []  # Resolved path strings, cheap to hand to worker processes
+        pending = {}  # Mtime and size of each file to scan, keyed by resolved path
+        results: List[ScanResult] = []  # Scan results, including those memoised in process
+        new_cache_data: Dict[str, CacheEntry] = {}  # Store updated cache info
+
+        for path_str, mtime, size in files_to_check:
+            if self.max_file_bytes is not None and size > self.max_file_bytes:
+                logger.warning(
+                    f"Skipping {path_str}: {size} bytes exceeds max_file_bytes "
+                    f"({self.max_file_bytes})"
+                )
+                continue
+            if size == 0:
+                # An empty file cannot define a model, no need to open it
+                module_path = self._module_path_from_resolved(path_str)
+                new_cache_data[path_str] = (mtime, False, module_path, _EMPTY_DIGEST, 0)
+                continue
+
+            # Check if file needs rescanning. A file whose size changed was edited, its
+            # contents are not worth comparing. With the same size, a file that was
+            # touched but not edited, e.g. by a checkout, keeps its result.
+            entry = cache_data.get(path_str)
+            if (
+                entry is not None
+                and entry[4] == size
+                and (
+                    (entry[0] == mtime and not self._must_verify_content(mtime))
+                    or self.cache.is_content_unchanged(path_str, entry[3])
+                )
+            ):
+                if entry[0] != mtime:
+                    entry = (mtime, entry[1], entry[2], entry[3], size)
+                # Use cached result, the entry tuple is carried over as is
+                new_cache_data[path_str] = entry
+                if entry[1] and entry[2]:
+                    self._discovered_modules.add(entry[2])
+            else:
+                pending[path_str] = (mtime, size)
+                memo_key = (path_str, mtime, size, self.collect_abstracts)
+                if memo_key in _scan_memo and not self._must_verify_content(mtime):
+                    # Scanned by another scanner in this process, e.g. with other patterns
+                    results.append(_scan_memo[memo_key])
+                else:
+                    files_to_scan.append(path_str)
 
         # Step 4: Scan remaining files
         if files_to_scan:
             logger.info(f"Scanning {len(files_to_scan)} files...")
 
-            results = []
+            scanned: List[ScanResult] = []
+            worker = functools.partial(scan_file_worker, collect_abstracts=self.collect_abstracts)
 
             # Determine if we should use parallel processing
             should_parallel = self.parallel_enabled
@@ -436,28 +924,36 @@ class ModelScanner:
 
             if should_parallel and len(files_to_scan) > 1:
                 max_workers = min(len(files_to_scan), cpu_count() or 1)
+                # Hand out files in batches, about four per worker, so each IPC
+                # round-trip and pickle covers many files instead of one
+                chunksize = max(1, min(64, len(files_to_scan) // (max_workers * 4)))
                 try:
-                    with ProcessPoolExecutor(max_workers=max_workers) as executor:
-                        results = list(executor.map(scan_file_worker, files_to_scan))
+                    scanned = list(_get_executor().map(worker, files_to_scan, chunksize=chunksize))
                 except Exception as e:
                     logger.warning(f"Parallel scanning failed, falling back to serial: {e}")
-                    results = [scan_file_worker(f) for f in files_to_scan]
+                    _discard_executor()
+                    scanned = [worker(f) for f in files_to_scan]
             else:
-                results = [scan_file_worker(f) for f in files_to_scan]
+                scanned = [worker(f) for f in files_to_scan]
 
-            # Collect results
-            for file_path, is_model, abstracts in results:
-                path_str = str(file_path.resolve())
-                module_path = self._get_module_path(file_path)
-                mtime = file_path.stat().st_mtime
+            for result in scanned:
+                if result[3] is not None:
+                    mtime, size = pending[result[0]]
+                    _memoise(_scan_memo, (result[0], mtime, size, self.collect_abstracts), result)
+            results.extend(scanned)
 
-                self._abstract_classes.update(abstracts)
+        # Collect results
+        for path_str, is_model, abstracts, digest in results:
+            mtime, size = pending[path_str]
+            module_path = self._module_path_from_resolved(path_str)
 
-                if is_model and module_path:
-                    self._discovered_modules.add(module_path)
-                    new_cache_data[path_str] = (mtime, True, module_path)
-                else:
-                    new_cache_data[path_str] = (mtime, False, module_path)
+            self._abstract_classes.update(abstracts)
+
+            if is_model and module_path:
+                self._discovered_modules.add(module_path)
+                new_cache_data[path_str] = (mtime, True, module_path, digest, size)
+            else:
+                new_cache_data[path_str] = (mtime, False, module_path, digest, size)
 
         # Step 5: Save cache
         self.cache.save(
@@ -500,16 +996,25 @@ class ModelScanner:
             modules = list(self._discovered_modules)
 
         imported_count = 0
+        warnings: List[str] = []
         base_path_str = str(self.base_path)
         if base_path_str not in sys.path:
             sys.path.insert(0, base_path_str)
 
-        for module_path in modules:
-            try:
-                importlib.import_module(module_path)
-                imported_count += 1
-            except ImportError as e:
-                print(f"Warning: Could not import {module_path}: {e}", file=sys.stderr)
-                continue
+        try:
+            for module_path in modules:
+                # Imported already, e.g. during strict mode verification, skip the import system
+                if sys.modules.get(module_path) is not None:
+                    imported_count += 1
+                    continue
+                try:
+                    importlib.import_module(module_path)
+                    imported_count += 1
+                except ImportError as e:
+                    warnings.append(f"Warning: Could not import {module_path}: {e}\n")
+        finally:
+            # Report every failed import in one write, even if another error stopped the loop
+            if warnings:
+                sys.stderr.write("".join(warnings))
 
         return imported_count
@@ -18,51 +18,50 @@ def parse_gitignore(gitignore_path: Path) -> List[str]:
     """
     patterns: List[str] = []
 
-    if not gitignore_path.exists():
-        return patterns
-
+    # A missing file surfaces as FileNotFoundError, so there is no separate exists() check
     try:
         with open(gitignore_path, encoding="utf-8") as f:
-            for line in f:
-                line = line.strip()
-                if not line or line.startswith("#"):
-                    continue
+            lines = f.read().splitlines()
+    except OSError:
+        return patterns
 
-                # Standardize patterns to resemble glob patterns used in scanner
-                # This is a best-effort conversion
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
 
-                # Handle negation
-                pattern = line
-                if pattern.startswith("!"):
-                    # We don't support negation in exclude patterns currently
-                    continue
+        # Standardize patterns to resemble glob patterns used in scanner
+        # This is a best-effort conversion
 
-                # Handle directory markers
-                if pattern.endswith("/"):
-                    pattern = pattern + "**"
+        # Handle negation
+        pattern = line
+        if pattern.startswith("!"):
+            # We don't support negation in exclude patterns currently
+            continue
 
-                # Handle root-anchored patterns
-                if pattern.startswith("/"):
-                    # /dist -> dist/**
-                    pattern = pattern[1:]
-                else:
-                    # node_modules -> **/node_modules/** if it's a directory or simple match
-                    if "/" not in pattern:
-                        # Simple name like 'venv' or '*.pyc'
-                        if "*" in pattern:
-                            pattern = "**/" + pattern
-                        else:
-                            # Could be file or directory, add both
-                            patterns.append(f"**/{pattern}/**")
-                            pattern = f"**/{pattern}"
-                    else:
-                        # my/path -> **/my/path
-                        if not pattern.startswith("**/") and not pattern.startswith("*"):
-                            pattern = f"**/{pattern}"
+        # Handle directory markers
+        if pattern.endswith("/"):
+            pattern = pattern + "**"
 
-                patterns.append(pattern)
+        # Handle root-anchored patterns
+        if pattern.startswith("/"):
+            # /dist -> dist/**
+            pattern = pattern[1:]
+        else:
+            # node_modules -> **/node_modules/** if it's a directory or simple match
+            if "/" not in pattern:
+                # Simple name like 'venv' or '*.pyc'
+                if "*" in pattern:
+                    pattern = "**/" + pattern
+                else:
+                    # Could be file or directory, add both
+                    patterns.append(f"**/{pattern}/**")
+                    pattern = f"**/{pattern}"
+            else:
+                # my/path -> **/my/path
+                if not pattern.startswith("**/") and not pattern.startswith("*"):
+                    pattern = f"**/{pattern}"
 
-    except OSError:
-        pass
+        patterns.append(pattern)
 
     return patterns
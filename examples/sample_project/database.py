@@ -2,17 +2,55 @@
 Database configuration for the example project.
 """
 
-from sqlalchemy import create_engine
+import os
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import declarative_base, sessionmaker
+from sqlalchemy.pool import StaticPool
 
 # Create the declarative base
 Base = declarative_base()
 
-# Database URL (SQLite for this example)
-DATABASE_URL = "sqlite:///./example.db"
+# Database URL (SQLite for this example, override with DATABASE_URL)
+DATABASE_URL = os.environ.get("DATABASE_URL", "sqlite:///./example.db")
+
+url = make_url(DATABASE_URL)
+if url.get_backend_name() == "sqlite":
+    # Let sessions in other threads use the connection they check out
+    engine_options = {"connect_args": {"check_same_thread": False}}
+    if url.database in (None, "", ":memory:"):
+        # Every connection would get its own empty in-memory database, share one instead
+        engine_options["poolclass"] = StaticPool
+else:
+    engine_options = {
+        "pool_size": int(os.environ.get("DB_POOL_SIZE", "10")),
+        "max_overflow": int(os.environ.get("DB_MAX_OVERFLOW", "20")),
+        "pool_pre_ping": True,
+        "pool_recycle": 1800,
+    }
+
+# Create engine, set SQL_ECHO=1 to log every statement
+engine = create_engine(url, echo=os.environ.get("SQL_ECHO") == "1", **engine_options)
+
+if engine.dialect.name == "sqlite" and engine.url.database not in (None, "", ":memory:"):
+
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        """Use WAL so readers are not blocked by writers, with fewer fsyncs per commit."""
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA busy_timeout=30000")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.execute("PRAGMA cache_size=-65536")
+        cursor.close()
+
+    @event.listens_for(engine, "close")
+    def _optimize_sqlite(dbapi_connection, connection_record):
+        """Let SQLite refresh its query planner statistics before a connection closes."""
+        dbapi_connection.execute("PRAGMA optimize")
 
-# Create engine
-engine = create_engine(DATABASE_URL, echo=True)
 
 # Create session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
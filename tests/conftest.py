@@ -0,0 +1,20 @@
+"""
+Shared pytest fixtures.
+"""
+
+import pytest
+
+from alembic_autoscan.config import _import_tomllib, _import_yaml
+
+
+@pytest.fixture(scope="session", autouse=True)
+def _warm_imports():
+    """Load the lazily imported config parsers once, before any timed test runs."""
+    _import_yaml()
+    _import_tomllib()
+
+
+@pytest.fixture(scope="class")
+def shared_tmp(tmp_path_factory):
+    """A temporary directory shared by the tests of a class, each writing its own files."""
+    return tmp_path_factory.mktemp("shared")
@@ -0,0 +1,65 @@
+"""
+Benchmarks of cold and warm discovery, run with pytest-benchmark.
+
+Compare runs with ``pytest tests/test_benchmarks.py --benchmark-autosave`` and
+``--benchmark-compare``; the module is skipped if pytest-benchmark is missing.
+"""
+
+from pathlib import Path
+
+import pytest
+
+from alembic_autoscan.scanner import ModelScanner, _parse_memo, _scan_memo
+
+pytest.importorskip("pytest_benchmark")
+
+NUM_MODELS = 100
+
+MODEL_TEMPLATE = """
+from sqlalchemy import Column, Integer
+from sqlalchemy.orm import declarative_base
+
+Base = declarative_base()
+
+class BenchModel{i}(Base):
+    __tablename__ = "bench_table_{i}"
+    id = Column(Integer, primary_key=True)
+"""
+
+
+@pytest.fixture
+def model_tree(tmp_path: Path) -> Path:
+    models_dir = tmp_path / "models"
+    models_dir.mkdir()
+    for i in range(NUM_MODELS):
+        (models_dir / f"bench_model_{i}.py").write_text(MODEL_TEMPLATE.format(i=i))
+    return tmp_path
+
+
+def _cold_scanner(base_path: Path):
+    # Forget results memoised in this process so that every round parses
+    _scan_memo.clear()
+    _parse_memo.clear()
+    return (ModelScanner(base_path=str(base_path), cache_enabled=False),), {}
+
+
+@pytest.mark.benchmark(group="discover")
+def test_scan_cold(benchmark, model_tree):
+    """Benchmark discovery that parses every file, without any cache."""
+    discovered = benchmark.pedantic(
+        ModelScanner.discover, setup=lambda: _cold_scanner(model_tree), rounds=5
+    )
+    assert len(discovered) == NUM_MODELS
+
+
+@pytest.mark.benchmark(group="discover")
+def test_scan_warm(benchmark, model_tree):
+    """Benchmark discovery served entirely from a populated cache."""
+    ModelScanner(base_path=str(model_tree), cache_enabled=True).discover()
+
+    discovered = benchmark.pedantic(
+        ModelScanner.discover,
+        setup=lambda: ((ModelScanner(base_path=str(model_tree), cache_enabled=True),), {}),
+        rounds=5,
+    )
+    assert len(discovered) == NUM_MODELS
@@ -2,137 +2,184 @@
 Tests for the caching system.
 """
 
-import tempfile
+import os
 import time
 from pathlib import Path
 from unittest.mock import patch
 
 import pytest
 
-from alembic_autoscan.cache import ScanCache
+from alembic_autoscan.cache import (
+    CACHE_HEADER,
+    CACHE_MAX_AGE,
+    CACHE_TOUCH_INTERVAL,
+    RECORD_LENGTH,
+    ScanCache,
+    content_digest,
+)
+
+
+def count_records(cache_file: Path) -> int:
+    """Count the length-prefixed records following the cache header."""
+    data = cache_file.read_bytes()[len(CACHE_HEADER) :]
+    offset = count = 0
+    while offset < len(data):
+        (length,) = RECORD_LENGTH.unpack_from(data, offset)
+        offset += RECORD_LENGTH.size + length
+        count += 1
+    return count
 
 
 class TestScanCache:
     """Test suite for ScanCache."""
 
-    def test_cache_initialization(self):
+    def test_cache_initialization(self, tmp_path):
         """Test cache initializes correctly."""
-        with tempfile.TemporaryDirectory() as tmpdir:
-            cache = ScanCache(cache_dir=Path(tmpdir), enabled=True)
-            assert cache.enabled is True
-            assert cache.cache_file == Path(tmpdir) / ".alembic-autoscan.cache"
+        cache = ScanCache(cache_dir=tmp_path, enabled=True)
+        assert cache.enabled is True
+        assert cache.cache_file == tmp_path / ".alembic-autoscan.cache"
 
-    def test_cache_disabled(self):
+    def test_cache_disabled(self, tmp_path):
         """Test cache operations when disabled."""
-        with tempfile.TemporaryDirectory() as tmpdir:
-            cache = ScanCache(cache_dir=Path(tmpdir), enabled=False)
+        cache = ScanCache(cache_dir=tmp_path, enabled=False)
 
-            # Should return None when loading
-            result = cache.load("/test", ["**/*.py"], [])
-            assert result is None
+        # Should return None when loading
+        result = cache.load("/test", ["**/*.py"], [])
+        assert result is None
 
-            # Should not save when disabled
-            cache.save("/test", ["**/*.py"], [], {})
-            assert not cache.cache_file.exists()
+        # Should not save when disabled
+        cache.save("/test", ["**/*.py"], [], {})
+        assert not cache.cache_file.exists()
 
-    def test_cache_save_and_load(self):
+    def test_cache_save_and_load(self, tmp_path):
         """Test saving and loading cache."""
-        with tempfile.TemporaryDirectory() as tmpdir:
-            cache = ScanCache(cache_dir=Path(tmpdir))
-
-            file_data = {
-                "/path/to/file.py": (1234567890.0, True, "models.file"),
-                "/path/to/other.py": (1234567891.0, False, None),
-            }
-
-            # Save cache
-            cache.save("/test", ["**/*.py"], ["**/tests/**"], file_data)
-            assert cache.cache_file.exists()
-
-            # Load cache
-            loaded = cache.load("/test", ["**/*.py"], ["**/tests/**"])
-            assert loaded is not None
-            assert len(loaded) == 2
-            assert loaded["/path/to/file.py"] == (1234567890.0, True, "models.file")
-            assert loaded["/path/to/other.py"] == (1234567891.0, False, None)
-
-    def test_cache_key_generation(self):
+        cache = ScanCache(cache_dir=tmp_path)
+
+        file_data = {
+            "/path/to/file.py": (1234567890, True, "models.file", None, 0),
+            "/path/to/other.py": (1234567891, False, None, None, 0),
+        }
+
+        # Save cache
+        cache.save("/test", ["**/*.py"], ["**/tests/**"], file_data)
+        assert cache.cache_file.exists()
+
+        # Load cache
+        loaded = cache.load("/test", ["**/*.py"], ["**/tests/**"])
+        assert loaded is not None
+        assert len(loaded) == 2
+        assert loaded["/path/to/file.py"] == (1234567890, True, "models.file", None, 0)
+        assert loaded["/path/to/other.py"] == (1234567891, False, None, None, 0)
+
+    def test_cache_key_generation(self, tmp_path):
         """Test that different configurations generate different cache keys."""
-        with tempfile.TemporaryDirectory() as tmpdir:
-            cache = ScanCache(cache_dir=Path(tmpdir))
+        cache = ScanCache(cache_dir=tmp_path)
 
-            # Save with first configuration
-            cache.save("/test1", ["**/*.py"], [], {"file1.py": (1.0, True, "mod1")})
+        # Save with first configuration
+        cache.save("/test1", ["**/*.py"], [], {"file1.py": (1, True, "mod1", None, 0)})
 
-            # Save with different configuration
-            cache.save("/test2", ["**/*.py"], [], {"file2.py": (2.0, True, "mod2")})
+        # Save with different configuration
+        cache.save("/test2", ["**/*.py"], [], {"file2.py": (2, True, "mod2", None, 0)})
 
-            # Both should be retrievable
-            data1 = cache.load("/test1", ["**/*.py"], [])
-            data2 = cache.load("/test2", ["**/*.py"], [])
+        # Both should be retrievable
+        data1 = cache.load("/test1", ["**/*.py"], [])
+        data2 = cache.load("/test2", ["**/*.py"], [])
 
-            assert data1 is not None
-            assert data2 is not None
-            assert "file1.py" in data1
-            assert "file2.py" in data2
+        assert data1 is not None
+        assert data2 is not None
+        assert "file1.py" in data1
+        assert "file2.py" in data2
+
+    def test_cache_key_is_order_independent_and_unambiguous(self):
+        """Test that pattern order is ignored and joined patterns do not collide."""
+        cache = ScanCache()
+        key = cache._generate_cache_key("/test", ["a", "b"], ["c"])
 
-    def test_cache_invalidation(self):
+        assert cache._generate_cache_key("/test", ["b", "a"], ["c"]) == key
+        assert cache._generate_cache_key("/test", ["a,b"], ["c"]) != key
+        assert cache._generate_cache_key("/test", ["a"], ["b", "c"]) != key
+
+    def test_cache_invalidation(self, tmp_path):
         """Test cache invalidation."""
-        with tempfile.TemporaryDirectory() as tmpdir:
-            cache = ScanCache(cache_dir=Path(tmpdir))
+        cache = ScanCache(cache_dir=tmp_path)
 
-            # Save cache
-            cache.save("/test", ["**/*.py"], [], {"file.py": (1.0, True, "mod")})
-            assert cache.cache_file.exists()
+        # Save cache
+        cache.save("/test", ["**/*.py"], [], {"file.py": (1, True, "mod", None, 0)})
+        assert cache.cache_file.exists()
 
-            # Invalidate
-            cache.invalidate()
-            assert not cache.cache_file.exists()
+        # Invalidate
+        cache.invalidate()
+        assert not cache.cache_file.exists()
 
-    def test_is_file_modified(self):
-        """Test file modification detection."""
-        with tempfile.TemporaryDirectory() as tmpdir:
-            cache = ScanCache(cache_dir=Path(tmpdir))
+    def test_is_file_modified(self, tmp_path):
+        """Test file modification detection against a loaded cache entry."""
+        cache = ScanCache(cache_dir=tmp_path)
+
+        # Create a test file and cache it
+        test_file = tmp_path / "test.py"
+        test_file.write_text("# test")
+        stat = test_file.stat()
+        cache.save(
+            "/test", ["**/*.py"], [], {str(test_file): (stat.st_mtime_ns, False, None, None, 6)}
+        )
+        mtime_ns, _, _, _, size = cache.load("/test", ["**/*.py"], [])[str(test_file)]
 
-            # Create a test file
-            test_file = Path(tmpdir) / "test.py"
-            test_file.write_text("# test")
+        # Should not be modified, whether given a Path or a string
+        assert not cache.is_file_modified(test_file, mtime_ns, size)
+        assert not cache.is_file_modified(str(test_file), mtime_ns, size)
 
-            # Get initial mtime
-            mtime = test_file.stat().st_mtime
+        # Modify file, moving its mtime on in case the clock is coarse
+        test_file.write_text("# modified")
+        os.utime(test_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
 
-            # Should not be modified
-            assert not cache.is_file_modified(test_file, mtime)
+        # Should be detected as modified
+        assert cache.is_file_modified(test_file, mtime_ns)
+
+    def test_is_file_modified_compares_size(self, tmp_path):
+        """Test that a size change is detected even when the mtime was kept."""
+        cache = ScanCache(cache_dir=tmp_path)
+        test_file = tmp_path / "test.py"
+        test_file.write_text("# test")
+        mtime_ns = test_file.stat().st_mtime_ns
+
+        assert not cache.is_file_modified(test_file, mtime_ns, 6)
+        assert cache.is_file_modified(test_file, mtime_ns, 7)
+
+    def test_is_content_unchanged(self, tmp_path):
+        """Test content comparison against a cached digest."""
+        cache = ScanCache(cache_dir=tmp_path)
+        test_file = tmp_path / "test.py"
+        test_file.write_bytes(b"# test")
+        digest = content_digest(b"# test")
 
-            # Modify file (wait a bit to ensure mtime changes)
-            time.sleep(0.01)
-            test_file.write_text("# modified")
+        assert cache.is_content_unchanged(test_file, digest)
+        assert not cache.is_content_unchanged(test_file, None)
 
-            # Should be detected as modified
-            assert cache.is_file_modified(test_file, mtime)
+        test_file.write_bytes(b"# modified")
+        assert not cache.is_content_unchanged(str(test_file), digest)
+        assert not cache.is_content_unchanged(tmp_path / "missing.py", digest)
 
     def test_is_file_modified_missing_file(self):
         """Test modification check for non-existent file."""
         cache = ScanCache()
 
         # Non-existent file should be considered modified
-        assert cache.is_file_modified(Path("/nonexistent/file.py"), 12345.0)
+        assert cache.is_file_modified(Path("/nonexistent/file.py"), 12345)
 
-    def test_cache_with_none_module_path(self):
+    def test_cache_with_none_module_path(self, tmp_path):
         """Test caching files that are not models."""
-        with tempfile.TemporaryDirectory() as tmpdir:
-            cache = ScanCache(cache_dir=Path(tmpdir))
+        cache = ScanCache(cache_dir=tmp_path)
 
-            file_data = {
-                "/path/to/model.py": (1.0, True, "models.model"),
-                "/path/to/util.py": (2.0, False, None),  # Not a model
-            }
+        file_data = {
+            "/path/to/model.py": (1, True, "models.model", None, 0),
+            "/path/to/util.py": (2, False, None, None, 0),  # Not a model
+        }
 
-            cache.save("/test", ["**/*.py"], [], file_data)
-            loaded = cache.load("/test", ["**/*.py"], [])
+        cache.save("/test", ["**/*.py"], [], file_data)
+        loaded = cache.load("/test", ["**/*.py"], [])
 
-            assert loaded is not None
-            assert loaded["/path/to/util.py"] == (2.0, False, None)
+        assert loaded is not None
+        assert loaded["/path/to/util.py"] == (2, False, None, None, 0)
 
     def test_load_corrupted_cache(self, tmp_path):
         """Test loading a corrupted cache file."""
@@ -150,7 +197,7 @@ class TestScanCache:
         # Mock open to raise IOError
         with patch("builtins.open", side_effect=OSError("disk full")):
             # Should not raise exception
-            cache.save(".", ["*"], [], {"f": (1.0, True, "m")})
+            cache.save(".", ["*"], [], {"f": (1, True, "m", None, 0)})
 
     def test_invalidate_os_error(self, tmp_path):
         """Test invalidating cache with OS error."""
@@ -176,12 +223,145 @@ class TestScanCache:
         """Test loading when cache file exists but key is missing."""
         cache = ScanCache(cache_dir=tmp_path)
         # Create cache with some data
-        cache.save("other_path", ["*"], [], {"f": (1.0, True, "m")})
+        cache.save("other_path", ["*"], [], {"f": (1, True, "m", None, 0)})
 
         # Try to load with different path (different key)
         result = cache.load("new_path", ["*"], [])
         assert result is None
 
+    def test_save_appends_only_changes(self, tmp_path):
+        """Test that saving appends changed entries instead of rewriting the file."""
+        cache = ScanCache(cache_dir=tmp_path)
+        file_data = {
+            "/path/a.py": (1, True, "a", None, 0),
+            "/path/b.py": (2, False, None, None, 0),
+            "/path/c.py": (3, False, None, None, 0),
+            "/path/d.py": (4, False, None, None, 0),
+        }
+
+        cache.save("/test", ["**/*.py"], [], file_data)
+        size_after_first = cache.cache_file.stat().st_size
+
+        # Saving identical data writes nothing
+        cache.save("/test", ["**/*.py"], [], dict(file_data))
+        assert cache.cache_file.stat().st_size == size_after_first
+
+        # Changing one entry and dropping another appends a single record
+        cache.save(
+            "/test",
+            ["**/*.py"],
+            [],
+            {
+                "/path/a.py": (5, True, "a", None, 0),
+                "/path/b.py": (2, False, None, None, 0),
+                "/path/c.py": (3, False, None, None, 0),
+            },
+        )
+        # Initial record plus one appended record
+        assert count_records(cache.cache_file) == 2
+
+        loaded = cache.load("/test", ["**/*.py"], [])
+        assert loaded is not None
+        assert loaded["/path/a.py"] == (5, True, "a", None, 0)
+        assert "/path/d.py" not in loaded
+
+    def test_save_compacts_log(self, tmp_path):
+        """Test that the log is rewritten once stale records dominate it."""
+        cache = ScanCache(cache_dir=tmp_path)
+
+        for mtime in range(5):
+            cache.save("/test", ["**/*.py"], [], {"/path/a.py": (mtime, True, "a", None, 0)})
+
+        # A single compacted record
+        assert count_records(cache.cache_file) == 1
+        assert cache.load("/test", ["**/*.py"], []) == {"/path/a.py": (4, True, "a", None, 0)}
+
+    def test_outdated_cache_format_is_replaced(self, tmp_path):
+        """Test that a cache file without the current header is ignored and rewritten."""
+        cache = ScanCache(cache_dir=tmp_path)
+        cache.cache_file.write_text('{"somekey": {"/path/a.py": {"mtime": 1.0}}}\n')
+
+        assert cache.load("/test", ["**/*.py"], []) is None
+
+        cache.save("/test", ["**/*.py"], [], {"/path/a.py": (1, True, "a", None, 0)})
+        assert cache.load("/test", ["**/*.py"], []) == {"/path/a.py": (1, True, "a", None, 0)}
+
+    def test_load_reuses_parsed_log(self, tmp_path):
+        """Test that an unchanged cache file is parsed only once."""
+        cache = ScanCache(cache_dir=tmp_path)
+        cache.save("/test", ["**/*.py"], [], {"/path/a.py": (1, True, "a", None, 0)})
+        assert cache.load("/test", ["**/*.py"], []) is not None
+
+        with patch("builtins.open", side_effect=AssertionError("cache file re-read")):
+            assert cache.load("/test", ["**/*.py"], []) == {"/path/a.py": (1, True, "a", None, 0)}
+
+        # A write from another process changes the file and is picked up
+        ScanCache(cache_dir=tmp_path).save(
+            "/test", ["**/*.py"], [], {"/path/b.py": (2, False, None, None, 0)}
+        )
+        assert cache.load("/test", ["**/*.py"], []) == {"/path/b.py": (2, False, None, None, 0)}
+
+    def test_save_keeps_written_log_in_memory(self, tmp_path):
+        """Test that a save does not force the log it just wrote to be read back."""
+        cache = ScanCache(cache_dir=tmp_path)
+        file_data = {f"/path/{name}.py": (1, False, None, None, 0) for name in "abcd"}
+        cache.save("/test", ["**/*.py"], [], file_data)
+        cache.save("/test", ["**/*.py"], [], {**file_data, "/path/a.py": (2, True, "a", None, 0)})
+
+        with patch("builtins.open", side_effect=AssertionError("cache file re-read")):
+            loaded = cache.load("/test", ["**/*.py"], [])
+        assert loaded == {**file_data, "/path/a.py": (2, True, "a", None, 0)}
+
+    def test_truncated_record_is_ignored(self, tmp_path):
+        """Test that a record cut short by an interrupted append is dropped and rewritten."""
+        cache = ScanCache(cache_dir=tmp_path)
+        file_data = {f"/path/{name}.py": (1, False, None, None, 0) for name in "abcd"}
+        cache.save("/test", ["**/*.py"], [], file_data)
+        cache.save("/test", ["**/*.py"], [], {**file_data, "/path/a.py": (2, True, "a", None, 0)})
+        assert count_records(cache.cache_file) == 2
+        cache.cache_file.write_bytes(cache.cache_file.read_bytes()[:-3])
+
+        # Entries from the intact records survive
+        assert cache.load("/test", ["**/*.py"], []) == file_data
+
+        # The next save rewrites the torn log instead of appending after it
+        cache.save("/test", ["**/*.py"], [], file_data)
+        assert count_records(cache.cache_file) == 1
+        assert cache.load("/test", ["**/*.py"], []) == file_data
+
+    def test_compaction_leaves_no_temporary_file(self, tmp_path):
+        """Test that the log is rewritten through a temporary file that is renamed away."""
+        cache = ScanCache(cache_dir=tmp_path)
+        cache.save("/test", ["**/*.py"], [], {"/path/a.py": (1, True, "a", None, 0)})
+
+        assert [p.name for p in tmp_path.iterdir()] == [".alembic-autoscan.cache"]
+
+    def test_save_evicts_stale_configurations(self, tmp_path):
+        """Test that configurations not saved within the maximum age are dropped."""
+        cache = ScanCache(cache_dir=tmp_path)
+        now = time.time()
+
+        with patch("alembic_autoscan.cache.time.time", return_value=now - CACHE_MAX_AGE - 1):
+            cache.save("/old", ["**/*.py"], [], {"/old/a.py": (1, True, "a", None, 0)})
+        cache.save("/new", ["**/*.py"], [], {"/new/b.py": (2, True, "b", None, 0)})
+
+        assert cache.load("/old", ["**/*.py"], []) is None
+        assert cache.load("/new", ["**/*.py"], []) == {"/new/b.py": (2, True, "b", None, 0)}
+        assert count_records(cache.cache_file) == 1
+
+    def test_unchanged_save_refreshes_timestamp(self, tmp_path):
+        """Test that a configuration in use is re-stamped even when nothing changed."""
+        cache = ScanCache(cache_dir=tmp_path)
+        file_data = {f"/path/{name}.py": (1, False, None, None, 0) for name in "abcd"}
+        now = time.time()
+
+        with patch("alembic_autoscan.cache.time.time", return_value=now - CACHE_TOUCH_INTERVAL - 1):
+            cache.save("/test", ["**/*.py"], [], file_data)
+        cache.save("/test", ["**/*.py"], [], file_data)
+
+        # An empty record was appended only to record the save time
+        assert count_records(cache.cache_file) == 2
+
 
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
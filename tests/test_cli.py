@@ -3,17 +3,18 @@ Tests for the CLI interface.
 """
 
 import argparse
-from unittest.mock import MagicMock, patch
+from unittest.mock import Mock, patch
 
 from alembic_autoscan.cli import check_command, main, scan_command
 from alembic_autoscan.config import Config
+from alembic_autoscan.scanner import ModelScanner
 
 
 class TestCLI:
     """Test suite for the CLI."""
 
     @patch("alembic_autoscan.cli.load_config")
-    @patch("alembic_autoscan.cli.ModelScanner")
+    @patch("alembic_autoscan.cli.ModelScanner", autospec=True)
     @patch("alembic_autoscan.cli.get_project_root")
     def test_scan_command_basic(self, mock_get_root, mock_scanner_class, mock_load_config):
         """Test scan_command with default path."""
@@ -25,7 +26,7 @@ class TestCLI:
         )
         mock_load_config.return_value = mock_config
 
-        mock_scanner = MagicMock()
+        mock_scanner = Mock(spec=ModelScanner)
         mock_scanner.discover.return_value = ["model1", "model2"]
         mock_scanner_class.return_value = mock_scanner
 
@@ -56,7 +57,7 @@ class TestCLI:
         mock_scanner.discover.assert_called_once()
 
     @patch("alembic_autoscan.cli.load_config")
-    @patch("alembic_autoscan.cli.ModelScanner")
+    @patch("alembic_autoscan.cli.ModelScanner", autospec=True)
     def test_scan_command_custom_path(self, mock_scanner_class, mock_load_config):
         """Test scan_command with custom path."""
         mock_config = Config(
@@ -66,7 +67,7 @@ class TestCLI:
         )
         mock_load_config.return_value = mock_config
 
-        mock_scanner = MagicMock()
+        mock_scanner = Mock(spec=ModelScanner)
         mock_scanner.discover.return_value = ["model1"]
         mock_scanner_class.return_value = mock_scanner
 
@@ -94,13 +95,13 @@ class TestCLI:
         )
 
     @patch("alembic_autoscan.cli.load_config")
-    @patch("alembic_autoscan.cli.ModelScanner")
+    @patch("alembic_autoscan.cli.ModelScanner", autospec=True)
     def test_scan_command_no_models_found(self, mock_scanner_class, mock_load_config):
         """Test scan_command when no models are found."""
         mock_config = Config(base_path="/empty/path")
         mock_load_config.return_value = mock_config
 
-        mock_scanner = MagicMock()
+        mock_scanner = Mock(spec=ModelScanner)
         mock_scanner.discover.return_value = []
         mock_scanner_class.return_value = mock_scanner
 
@@ -1,22 +1,19 @@
+import os
 import tempfile
 import time
+from collections import deque
 from pathlib import Path
+from typing import List, Tuple
+from unittest.mock import patch
 
 import pytest
 
 from alembic_autoscan.scanner import ModelScanner
 
+# Generate the structure in RAM where available, /tmp may be a real disk on CI runners
+_TMPDIR_BASE = "/dev/shm" if os.path.isdir("/dev/shm") and os.access("/dev/shm", os.W_OK) else None
 
-def create_nested_structure(base_dir: Path, depth: int, current_level: int, width: int):
-    if current_level > depth:
-        return
-
-    # Create models in current directory
-    for i in range(width):
-        model_name = f"Model_L{current_level}_{i}"
-        parent_name = f"Model_L{current_level - 1}_{i}" if current_level > 0 else "Base"
-
-        content = f"""
+_MODEL_HEADER = """
 from sqlalchemy import Column, Integer, String
 from sqlalchemy.orm import declarative_base
 
@@ -26,11 +23,11 @@ from typing import (
     Optional,
     Union
 )
+"""
 
-{f"from ..model_{i} import {parent_name}" if current_level > 0 else "Base = declarative_base()"}
-
+_MODEL_CLASS = """
 class {model_name}({parent_name}):
-    __tablename__ = "table_l{current_level}_{i}"
+    __tablename__ = "table_l{level}_{i}"
 
     # Indented complex definition
     id = Column(
@@ -44,14 +41,42 @@ class {model_name}({parent_name}):
             if True:
                 return "nested"
 """
-        (base_dir / f"model_{i}.py").write_text(content)
 
-    # Recurse
-    if current_level < depth:
-        for w in range(width):
-            subdir = base_dir / f"sub_{w}"
-            subdir.mkdir()
-            create_nested_structure(subdir, depth, current_level + 1, width)
+# Generated model modules, filled in with str.format_map
+_ROOT_TPL = _MODEL_HEADER + "\nBase = declarative_base()\n" + _MODEL_CLASS
+_CHILD_TPL = _MODEL_HEADER + "\nfrom ..model_{i} import {parent_name}\n" + _MODEL_CLASS
+
+
+def create_nested_structure(base_dir: Path, depth: int, current_level: int, width: int):
+    if current_level > depth:
+        return
+
+    # Directories are created while walking the tree, the files are written at the end
+    files: List[Tuple[Path, str]] = []
+    stack = deque([(base_dir, current_level)])
+    while stack:
+        directory, level = stack.pop()
+
+        # Create models in current directory
+        template = _CHILD_TPL if level > 0 else _ROOT_TPL
+        for i in range(width):
+            model_name = f"Model_L{level}_{i}"
+            parent_name = f"Model_L{level - 1}_{i}" if level > 0 else "Base"
+
+            content = template.format_map(
+                {"model_name": model_name, "parent_name": parent_name, "level": level, "i": i}
+            )
+            files.append((directory / f"model_{i}.py", content))
+
+        # Descend
+        if level < depth:
+            for w in range(width):
+                subdir = directory / f"sub_{w}"
+                subdir.mkdir()
+                stack.append((subdir, level + 1))
+
+    for path, content in files:
+        path.write_text(content)
 
 
 def test_complex_nested_structure_performance():
@@ -79,7 +104,7 @@ def test_complex_nested_structure_performance():
     WIDTH = 3
     FILES_PER_DIR = 3
 
-    with tempfile.TemporaryDirectory() as tmpdir:
+    with tempfile.TemporaryDirectory(dir=_TMPDIR_BASE) as tmpdir:
         base_path = Path(tmpdir)
 
         print(f"\nGenerating complex structure (Depth={DEPTH}, Width={WIDTH})...")
@@ -102,8 +127,11 @@ def test_complex_nested_structure_performance():
         print("Starting Warm Scan...")
         start_warm = time.perf_counter()
         scanner2 = ModelScanner(base_path=str(base_path), cache_enabled=True)
-        discovered2 = scanner2.discover()
+        with patch("alembic_autoscan.scanner.scan_file_worker") as mock_worker:
+            discovered2 = scanner2.discover()
         warm_time = time.perf_counter() - start_warm
+        # Nothing is parsed again, every result comes from the cache
+        mock_worker.assert_not_called()
 
         print(f"Warm Scan took {warm_time:.4f}s")
 
@@ -2,13 +2,32 @@
 Tests for the configuration system.
 """
 
+import os
 import tempfile
 from pathlib import Path
 from unittest.mock import patch
 
 import pytest
 
-from alembic_autoscan.config import Config, _find_config_file, load_config, setup_logging
+from alembic_autoscan.config import (
+    Config,
+    _find_config_file,
+    _find_config_files,
+    load_config,
+    setup_logging,
+)
+
+# Every programmatic argument of load_config at once
+_ALL_ARGS = {
+    "base_path": "/tmp",
+    "include_patterns": ["*.py"],
+    "exclude_patterns": ["test"],
+    "log_level": "DEBUG",
+    "cache_enabled": False,
+    "parallel_enabled": True,
+    "parallel_threshold": 500,
+    "strict_mode": True,
+}
 
 
 class TestConfig:
@@ -82,7 +101,7 @@ class TestConfigFileLoading:
 
             # Create config file in root
             config_file = Path(tmpdir) / ".alembic-autoscan.yaml"
-            config_file.write_text("test: true")
+            config_file.write_bytes(b"test: true")
 
             # Should find config from nested directory
             found = _find_config_file(start_path=nested_dir)
@@ -94,30 +113,35 @@ class TestConfigFileLoading:
             found = _find_config_file(start_path=Path(tmpdir))
             assert found is None
 
-    def test_load_config_with_programmatic_args(self):
-        """Test that programmatic arguments have highest priority."""
-        config = load_config(
-            base_path="/test",
-            log_level="DEBUG",
-            cache_enabled=False,
-        )
-
-        assert config.base_path == "/test"
-        assert config.log_level == "DEBUG"
-        assert config.cache_enabled is False
-
-    def test_load_config_defaults(self):
-        """Test loading config with all defaults."""
-        config = load_config()
-
-        assert config.base_path == "."
-        assert config.log_level == "WARNING"
-        assert config.cache_enabled is True
+    @pytest.mark.parametrize(
+        "kwargs,expected",
+        [
+            ({}, {"base_path": ".", "log_level": "WARNING", "cache_enabled": True}),
+            (
+                {"base_path": "/test", "log_level": "DEBUG", "cache_enabled": False},
+                {"base_path": "/test", "log_level": "DEBUG", "cache_enabled": False},
+            ),
+            ({"base_path": "/tmp"}, {"base_path": "/tmp"}),
+            ({"include_patterns": ["*.py"]}, {"include_patterns": ["*.py"]}),
+            ({"exclude_patterns": ["test"]}, {"exclude_patterns": ["test"]}),
+            ({"parallel_enabled": True}, {"parallel_enabled": True}),
+            ({"parallel_threshold": 500}, {"parallel_threshold": 500}),
+            ({"strict_mode": True}, {"strict_mode": True}),
+            (_ALL_ARGS, _ALL_ARGS),
+        ],
+    )
+    def test_load_config_arguments(self, kwargs, expected):
+        """Test that programmatic arguments have highest priority over the defaults."""
+        config = load_config(**kwargs)
+
+        for key, value in expected.items():
+            assert getattr(config, key) == value
 
     def test_load_yaml_config(self, tmp_path):
         """Test loading configuration from YAML file."""
+        pytest.importorskip("yaml")
         yaml_file = tmp_path / ".alembic-autoscan.yaml"
-        yaml_file.write_text("base_path: /yaml/path\nlog_level: DEBUG")
+        yaml_file.write_bytes(b"base_path: /yaml/path\nlog_level: DEBUG")
 
         from alembic_autoscan.config import _load_yaml_config
 
@@ -126,11 +150,26 @@ class TestConfigFileLoading:
         assert data["base_path"] == "/yaml/path"
         assert data["log_level"] == "DEBUG"
 
+    def test_load_yaml_config_without_libyaml(self, tmp_path, monkeypatch):
+        """Test that YAML still loads with the pure Python loader when libyaml is missing."""
+        yaml = pytest.importorskip("yaml")
+        monkeypatch.delattr(yaml, "CSafeLoader", raising=False)
+        yaml_file = tmp_path / ".alembic-autoscan.yaml"
+        yaml_file.write_bytes(b"base_path: /yaml/path")
+
+        from alembic_autoscan.config import _load_yaml_config
+
+        with patch.object(yaml, "load", wraps=yaml.load) as mock_load:
+            data = _load_yaml_config(yaml_file)
+
+        assert data == {"base_path": "/yaml/path"}
+        assert mock_load.call_args.kwargs["Loader"] is yaml.SafeLoader
+
     def test_load_toml_config(self, tmp_path):
         """Test loading configuration from pyproject.toml."""
         toml_file = tmp_path / "pyproject.toml"
-        toml_file.write_text(
-            '[tool.alembic-autoscan]\nbase_path = "/toml/path"\nlog_level = "INFO"'
+        toml_file.write_bytes(
+            b'[tool.alembic-autoscan]\nbase_path = "/toml/path"\nlog_level = "INFO"'
         )
 
         from alembic_autoscan.config import _load_toml_config
@@ -142,12 +181,71 @@ class TestConfigFileLoading:
 
     def test_load_config_with_explicit_file(self, tmp_path):
         """Test load_config with explicit config file."""
+        pytest.importorskip("yaml")
         config_file = tmp_path / "custom.yaml"
-        config_file.write_text("base_path: /custom/path")
+        config_file.write_bytes(b"base_path: /custom/path")
 
         config = load_config(config_file=str(config_file))
         assert config.base_path == "/custom/path"
 
+    def test_load_config_prefers_toml(self, tmp_path, monkeypatch):
+        """Test that pyproject.toml wins over YAML, which is only parsed for missing options."""
+        pytest.importorskip("yaml")
+        monkeypatch.chdir(tmp_path)
+        (tmp_path / ".alembic-autoscan.yaml").write_bytes(b"base_path: /yaml\nlog_level: DEBUG")
+        (tmp_path / "pyproject.toml").write_bytes(b'[tool.alembic-autoscan]\nbase_path = "/toml"')
+
+        config = load_config()
+        assert config.base_path == "/toml"
+        assert config.log_level == "DEBUG"
+
+        # Every other option is given, so the YAML file has nothing left to contribute
+        with patch("alembic_autoscan.config._load_yaml_config") as mock_yaml:
+            config = load_config(
+                include_patterns=["*.py"],
+                exclude_patterns=[],
+                log_level="INFO",
+                cache_enabled=True,
+                parallel_enabled=False,
+                parallel_threshold=10,
+                strict_mode=False,
+            )
+        assert config.base_path == "/toml"
+        mock_yaml.assert_not_called()
+
+    def test_find_config_files_single_walk(self, tmp_path):
+        """Test finding several config files at different levels in one walk."""
+        nested_dir = tmp_path / "a" / "b"
+        nested_dir.mkdir(parents=True)
+        (tmp_path / ".alembic-autoscan.yaml").touch()
+        (tmp_path / "a" / "pyproject.toml").touch()
+
+        found = _find_config_files(
+            start_path=nested_dir, filenames=(".alembic-autoscan.yaml", "pyproject.toml")
+        )
+        assert found == {
+            ".alembic-autoscan.yaml": tmp_path / ".alembic-autoscan.yaml",
+            "pyproject.toml": tmp_path / "a" / "pyproject.toml",
+        }
+
+    def test_find_config_file_memoized(self, tmp_path):
+        """Test that a repeated lookup skips listing directories until one of them changes."""
+        nested_dir = tmp_path / "a" / "b"
+        nested_dir.mkdir(parents=True)
+        (tmp_path / ".alembic-autoscan.yaml").touch()
+        for directory in (nested_dir, nested_dir.parent, tmp_path):
+            os.utime(directory, (0, 10**9))
+
+        assert _find_config_file(start_path=nested_dir) == tmp_path / ".alembic-autoscan.yaml"
+        with patch("alembic_autoscan.config.os.scandir", wraps=os.scandir) as mock_scandir:
+            found = _find_config_file(start_path=nested_dir)
+        assert found == tmp_path / ".alembic-autoscan.yaml"
+        mock_scandir.assert_not_called()
+
+        # A new file nearer the start updates its directory's mtime
+        (nested_dir / ".alembic-autoscan.yaml").touch()
+        assert _find_config_file(start_path=nested_dir) == nested_dir / ".alembic-autoscan.yaml"
+
     def test_find_config_file_max_depth(self, tmp_path):
         """Test max_depth limit in _find_config_file."""
         root = tmp_path
@@ -168,12 +266,49 @@ class TestConfigFileLoading:
         found = _find_config_file(start_path=current, max_depth=20)
         assert found == config_file
 
+    def test_load_toml_reuses_parse_until_changed(self, tmp_path):
+        """Test that an unchanged config file is not parsed again."""
+        from alembic_autoscan.config import _import_tomllib, _load_toml_config
+
+        toml_file = tmp_path / "pyproject.toml"
+        toml_file.write_bytes(b'[tool.alembic-autoscan]\nlog_level = "INFO"\n')
+        assert _load_toml_config(toml_file) == {"log_level": "INFO"}
+
+        tomllib = _import_tomllib()
+        with patch.object(tomllib, "loads", side_effect=AssertionError("parsed again")):
+            data = _load_toml_config(toml_file)
+            assert data == {"log_level": "INFO"}
+
+        # Mutating the returned data does not leak into later loads
+        data["log_level"] = "DEBUG"
+        assert _load_toml_config(toml_file) == {"log_level": "INFO"}
+
+        toml_file.write_bytes(b'[tool.alembic-autoscan]\nlog_level = "ERROR"\n')
+        assert _load_toml_config(toml_file) == {"log_level": "ERROR"}
+
+    def test_parsed_configs_are_bounded(self, tmp_path):
+        """Test that the parsed config memo evicts its oldest entry when full."""
+        from alembic_autoscan.config import _load_toml_config, _parsed_configs
+
+        paths = []
+        for i in range(3):
+            toml_file = tmp_path / f"{i}.toml"
+            toml_file.write_bytes(b"[tool.alembic-autoscan]\n")
+            paths.append(toml_file)
+
+        with patch("alembic_autoscan.config._PARSED_CONFIGS_SIZE", 2), patch.dict(
+            _parsed_configs, clear=True
+        ):
+            for toml_file in paths:
+                _load_toml_config(toml_file)
+            assert [path for _, path in _parsed_configs] == [str(p) for p in paths[1:]]
+
     def test_load_yaml_no_pyyaml(self, tmp_path):
         """Test behavior when PyYAML is not installed."""
         yaml_file = tmp_path / "test.yaml"
         yaml_file.touch()
 
-        with patch("alembic_autoscan.config.yaml", None):
+        with patch("alembic_autoscan.config._import_yaml", return_value=None):
             from alembic_autoscan.config import _load_yaml_config
 
             data = _load_yaml_config(yaml_file)
@@ -184,7 +319,7 @@ class TestConfigFileLoading:
         toml_file = tmp_path / "pyproject.toml"
         toml_file.touch()
 
-        with patch("alembic_autoscan.config.tomllib", None):
+        with patch("alembic_autoscan.config._import_tomllib", return_value=None):
             from alembic_autoscan.config import _load_toml_config
 
             data = _load_toml_config(toml_file)
@@ -193,7 +328,7 @@ class TestConfigFileLoading:
     def test_load_yaml_exception(self, tmp_path):
         """Test YAML load exception handling."""
         yaml_file = tmp_path / "error.yaml"
-        yaml_file.write_text("!!python/object:nonexistent.Class {}")
+        yaml_file.write_bytes(b"!!python/object:nonexistent.Class {}")
 
         from alembic_autoscan.config import _load_yaml_config
 
@@ -204,7 +339,7 @@ class TestConfigFileLoading:
     def test_load_toml_exception(self, tmp_path):
         """Test TOML load exception handling."""
         toml_file = tmp_path / "error.toml"
-        toml_file.write_text("invalid = [toml")
+        toml_file.write_bytes(b"invalid = [toml")
 
         from alembic_autoscan.config import _load_toml_config
 
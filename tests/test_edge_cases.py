@@ -2,9 +2,6 @@
 Tests for edge cases and enhanced detection features.
 """
 
-import tempfile
-from pathlib import Path
-
 import pytest
 
 from alembic_autoscan.scanner import ModelScanner, scan_file_worker
@@ -13,12 +10,11 @@ from alembic_autoscan.scanner import ModelScanner, scan_file_worker
 class TestSQLModelDetection:
     """Test detection of SQLModel models."""
 
-    def test_detect_sqlmodel_with_table_true(self):
+    def test_detect_sqlmodel_with_table_true(self, shared_tmp):
         """Test detection of SQLModel with table=True."""
-        with tempfile.TemporaryDirectory() as tmpdir:
-            model_file = Path(tmpdir) / "hero.py"
-            model_file.write_text(
-                """
+        model_file = shared_tmp / "hero.py"
+        model_file.write_bytes(
+            b"""
 from sqlmodel import SQLModel, Field
 from typing import Optional
 
@@ -27,38 +23,36 @@ class Hero(SQLModel, table=True):
     name: str
     secret_name: str
 """
-            )
+        )
 
-            _, is_model, _ = scan_file_worker(model_file)
-            assert is_model
+        _, is_model, _, _ = scan_file_worker(model_file)
+        assert is_model
 
-    def test_ignore_sqlmodel_without_table(self):
+    def test_ignore_sqlmodel_without_table(self, shared_tmp):
         """Test that SQLModel without table=True is ignored."""
-        with tempfile.TemporaryDirectory() as tmpdir:
-            model_file = Path(tmpdir) / "schema.py"
-            model_file.write_text(
-                """
+        model_file = shared_tmp / "schema.py"
+        model_file.write_bytes(
+            b"""
 from sqlmodel import SQLModel
 
 class HeroBase(SQLModel):
     name: str
     secret_name: str
 """
-            )
+        )
 
-            _, is_model, _ = scan_file_worker(model_file)
-            assert not is_model
+        _, is_model, _, _ = scan_file_worker(model_file)
+        assert not is_model
 
 
 class TestAbstractClassDetection:
     """Test detection and filtering of abstract base classes."""
 
-    def test_detect_abstract_class(self):
+    def test_detect_abstract_class(self, shared_tmp):
         """Test detection of abstract base classes."""
-        with tempfile.TemporaryDirectory() as tmpdir:
-            model_file = Path(tmpdir) / "base.py"
-            model_file.write_text(
-                """
+        model_file = shared_tmp / "base.py"
+        model_file.write_bytes(
+            b"""
 from sqlalchemy import Column, Integer
 from database import Base
 
@@ -69,58 +63,56 @@ class AbstractBase(Base):
 class ConcreteModel(AbstractBase):
     __tablename__ = "concrete"
 """
-            )
+        )
 
-            _, is_model, abstracts = scan_file_worker(model_file)
+        _, is_model, abstracts, _ = scan_file_worker(model_file)
 
-            # Should detect the file has models (ConcreteModel)
-            assert is_model
+        # Should detect the file has models (ConcreteModel)
+        assert is_model
 
-            # Should have tracked the abstract class
-            assert "AbstractBase" in abstracts
+        # Should have tracked the abstract class
+        assert "AbstractBase" in abstracts
 
-    def test_skip_abstract_class_in_discovery(self):
+    def test_skip_abstract_class_in_discovery(self, tmp_path):
         """Test that abstract classes don't get their own module entry."""
-        with tempfile.TemporaryDirectory() as tmpdir:
-            # File with only abstract class
-            abstract_file = Path(tmpdir) / "abstract_only.py"
-            abstract_file.write_text(
-                """
+        # File with only abstract class
+        abstract_file = tmp_path / "abstract_only.py"
+        abstract_file.write_bytes(
+            b"""
 from database import Base
 
 class AbstractModel(Base):
     __abstract__ = True
 """
-            )
+        )
 
-            # File with concrete model
-            concrete_file = Path(tmpdir) / "concrete.py"
-            concrete_file.write_text(
-                """
+        # File with concrete model
+        concrete_file = tmp_path / "concrete.py"
+        concrete_file.write_bytes(
+            b"""
 from database import Base
 
 class ConcreteModel(Base):
     __tablename__ = "concrete"
 """
-            )
+        )
 
-            scanner = ModelScanner(base_path=tmpdir)
-            modules = scanner.discover()
+        scanner = ModelScanner(base_path=str(tmp_path))
+        modules = scanner.discover()
 
-            # Should only discover the concrete model
-            assert "concrete" in modules
-            assert "abstract_only" not in modules
+        # Should only discover the concrete model
+        assert "concrete" in modules
+        assert "abstract_only" not in modules
 
 
 class TestModernSQLAlchemy:
     """Test detection of modern SQLAlchemy 2.0 patterns."""
 
-    def test_detect_mapped_annotation(self):
+    def test_detect_mapped_annotation(self, shared_tmp):
         """Test detection of Mapped[] annotations."""
-        with tempfile.TemporaryDirectory() as tmpdir:
-            model_file = Path(tmpdir) / "modern.py"
-            model_file.write_text(
-                """
+        model_file = shared_tmp / "modern.py"
+        model_file.write_bytes(
+            b"""
 from sqlalchemy.orm import Mapped, mapped_column
 from database import Base
 
@@ -130,17 +122,16 @@ class ModernModel(Base):
     id: Mapped[int] = mapped_column(primary_key=True)
     name: Mapped[str]
 """
-            )
+        )
 
-            _, is_model, _ = scan_file_worker(model_file)
-            assert is_model
+        _, is_model, _, _ = scan_file_worker(model_file)
+        assert is_model
 
-    def test_detect_mapped_column(self):
+    def test_detect_mapped_column(self, shared_tmp):
         """Test detection of mapped_column() calls."""
-        with tempfile.TemporaryDirectory() as tmpdir:
-            model_file = Path(tmpdir) / "model.py"
-            model_file.write_text(
-                """
+        model_file = shared_tmp / "model.py"
+        model_file.write_bytes(
+            b"""
 from sqlalchemy.orm import mapped_column
 from database import Base
 
@@ -148,39 +139,37 @@ class User(Base):
     __tablename__ = "users"
     id = mapped_column(primary_key=True)
 """
-            )
+        )
 
-            _, is_model, _ = scan_file_worker(model_file)
-            assert is_model
+        _, is_model, _, _ = scan_file_worker(model_file)
+        assert is_model
 
 
 class TestMixins:
     """Test handling of mixins and multiple inheritance."""
 
-    def test_mixin_without_table(self):
+    def test_mixin_without_table(self, shared_tmp):
         """Test that mixins without __tablename__ are not detected."""
-        with tempfile.TemporaryDirectory() as tmpdir:
-            mixin_file = Path(tmpdir) / "mixins.py"
-            mixin_file.write_text(
-                """
+        mixin_file = shared_tmp / "mixins.py"
+        mixin_file.write_bytes(
+            b"""
 from sqlalchemy import Column, Integer
 
 class TimestampMixin:
     created_at = Column(Integer)
     updated_at = Column(Integer)
 """
-            )
+        )
 
-            # Mixin without Base or __tablename__ should not be detected
-            _, is_model, _ = scan_file_worker(mixin_file)
-            assert not is_model
+        # Mixin without Base or __tablename__ should not be detected
+        _, is_model, _, _ = scan_file_worker(mixin_file)
+        assert not is_model
 
-    def test_model_with_mixin(self):
+    def test_model_with_mixin(self, shared_tmp):
         """Test model that uses a mixin."""
-        with tempfile.TemporaryDirectory() as tmpdir:
-            model_file = Path(tmpdir) / "user.py"
-            model_file.write_text(
-                """
+        model_file = shared_tmp / "user.py"
+        model_file.write_bytes(
+            b"""
 from sqlalchemy import Column, Integer, String
 from database import Base
 from mixins import TimestampMixin
@@ -190,59 +179,57 @@ class User(Base, TimestampMixin):
     id = Column(Integer, primary_key=True)
     name = Column(String)
 """
-            )
+        )
 
-            _, is_model, _ = scan_file_worker(model_file)
-            assert is_model
+        _, is_model, _, _ = scan_file_worker(model_file)
+        assert is_model
 
 
 class TestCacheIntegration:
     """Test scanner with caching enabled."""
 
-    def test_scanner_with_cache(self):
+    def test_scanner_with_cache(self, tmp_path):
         """Test that scanner uses cache correctly."""
-        with tempfile.TemporaryDirectory() as tmpdir:
-            model_file = Path(tmpdir) / "cached_model.py"
-            model_file.write_text(
-                """
+        model_file = tmp_path / "cached_model.py"
+        model_file.write_bytes(
+            b"""
 from database import Base
 
 class CachedModel(Base):
     __tablename__ = "cached"
 """
-            )
+        )
 
-            scanner = ModelScanner(base_path=tmpdir, cache_enabled=True)
+        scanner = ModelScanner(base_path=str(tmp_path), cache_enabled=True)
 
-            # First discovery should create cache
-            modules1 = scanner.discover()
-            assert "cached_model" in modules1
-            assert (Path(tmpdir) / ".alembic-autoscan.cache").exists()
+        # First discovery should create cache
+        modules1 = scanner.discover()
+        assert "cached_model" in modules1
+        assert (tmp_path / ".alembic-autoscan.cache").exists()
 
-            # Second discovery should use cache
-            scanner2 = ModelScanner(base_path=tmpdir, cache_enabled=True)
-            modules2 = scanner2.discover()
-            assert modules1 == modules2
+        # Second discovery should use cache
+        scanner2 = ModelScanner(base_path=str(tmp_path), cache_enabled=True)
+        modules2 = scanner2.discover()
+        assert modules1 == modules2
 
-    def test_scanner_without_cache(self):
+    def test_scanner_without_cache(self, tmp_path):
         """Test scanner with caching disabled."""
-        with tempfile.TemporaryDirectory() as tmpdir:
-            model_file = Path(tmpdir) / "model.py"
-            model_file.write_text(
-                """
+        model_file = tmp_path / "model.py"
+        model_file.write_bytes(
+            b"""
 from database import Base
 
 class Model(Base):
     __tablename__ = "model"
 """
-            )
+        )
 
-            scanner = ModelScanner(base_path=tmpdir, cache_enabled=False)
-            modules = scanner.discover()
+        scanner = ModelScanner(base_path=str(tmp_path), cache_enabled=False)
+        modules = scanner.discover()
 
-            assert "model" in modules
-            # Cache file should not be created
-            assert not (Path(tmpdir) / ".alembic-autoscan.cache").exists()
+        assert "model" in modules
+        # Cache file should not be created
+        assert not (tmp_path / ".alembic-autoscan.cache").exists()
 
 
 if __name__ == "__main__":
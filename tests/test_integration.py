@@ -3,7 +3,10 @@ Tests for the integration helpers.
 """
 
 from pathlib import Path
-from unittest.mock import MagicMock, patch
+from typing import List, Optional
+from unittest.mock import patch
+
+import pytest
 
 from alembic_autoscan.integration import (
     get_project_root,
@@ -12,31 +15,47 @@ from alembic_autoscan.integration import (
 )
 
 
+class _StubScanner:
+    """Stand-in for ModelScanner that finds one module and records how it was used."""
+
+    instances: List["_StubScanner"] = []
+
+    def __init__(self, **kwargs):
+        _StubScanner.instances.append(self)
+        self.kwargs = kwargs
+        self.discovered = 0
+        self.imported: Optional[List[str]] = None
+
+    def discover(self):
+        self.discovered += 1
+        return ["app.models.user"]
+
+    def import_models(self, modules):
+        self.imported = modules
+        return 1
+
+
 class TestIntegration:
     """Test suite for integration helpers."""
 
-    @patch("alembic_autoscan.integration.ModelScanner")
-    def test_import_models_basic(self, mock_scanner_class):
+    @pytest.fixture(autouse=True)
+    def _reset_stub_scanner(self):
+        _StubScanner.instances = []
+
+    def test_import_models_basic(self, monkeypatch):
         """Test import_models with default arguments."""
-        mock_scanner = MagicMock()
-        mock_scanner.discover.return_value = ["app.models.user"]
-        mock_scanner.import_models.return_value = 1
-        mock_scanner_class.return_value = mock_scanner
+        monkeypatch.setattr("alembic_autoscan.integration.ModelScanner", _StubScanner)
 
         count = import_models()
 
         assert count == 1
-        mock_scanner_class.assert_called_once()
-        mock_scanner.discover.assert_called_once()
-        mock_scanner.import_models.assert_called_with(["app.models.user"])
+        (scanner,) = _StubScanner.instances
+        assert scanner.discovered == 1
+        assert scanner.imported == ["app.models.user"]
 
-    @patch("alembic_autoscan.integration.ModelScanner")
-    def test_import_models_custom(self, mock_scanner_class):
+    def test_import_models_custom(self, monkeypatch):
         """Test import_models with custom arguments."""
-        mock_scanner = MagicMock()
-        mock_scanner.discover.return_value = ["app.models.user"]
-        mock_scanner.import_models.return_value = 1
-        mock_scanner_class.return_value = mock_scanner
+        monkeypatch.setattr("alembic_autoscan.integration.ModelScanner", _StubScanner)
 
         count = import_models(
             base_path="/tmp/test",
@@ -46,13 +65,14 @@ class TestIntegration:
         )
 
         assert count == 1
-        mock_scanner_class.assert_called_once_with(
-            base_path="/tmp/test",
-            include_patterns=["**/models/**"],
-            exclude_patterns=["**/tests/**"],
-        )
-
-    def test_get_project_root(self, tmp_path):
+        (scanner,) = _StubScanner.instances
+        assert scanner.kwargs == {
+            "base_path": "/tmp/test",
+            "include_patterns": ["**/models/**"],
+            "exclude_patterns": ["**/tests/**"],
+        }
+
+    def test_get_project_root(self, tmp_path, monkeypatch):
         """Test get_project_root finding markers."""
         # Create a mock project structure
         project_root = tmp_path / "my_project"
@@ -62,20 +82,42 @@ class TestIntegration:
         sub_dir = project_root / "src" / "myapp"
         sub_dir.mkdir(parents=True)
 
-        # Change CWD to sub_dir
-        with patch("pathlib.Path.cwd", return_value=sub_dir):
-            root = get_project_root()
-            assert root == project_root
+        root = get_project_root(start=sub_dir)
+        assert root == project_root
+
+        # Without a start directory the search begins at the current directory
+        monkeypatch.chdir(sub_dir)
+        assert get_project_root() == project_root
+
+        # A relative start directory is resolved against the current directory
+        monkeypatch.chdir(project_root)
+        assert get_project_root(start="src/myapp") == project_root
+
+    def test_get_project_root_nested_marker(self, tmp_path):
+        """Test get_project_root with a marker below the project root."""
+        project_root = tmp_path / "my_project"
+        (project_root / "alembic").mkdir(parents=True)
+        (project_root / "alembic" / "env.py").touch()
+        (project_root / "pyproject.toml").touch()
+
+        sub_dir = project_root / "src" / "myapp"
+        sub_dir.mkdir(parents=True)
+        (sub_dir / "alembic").mkdir()
+
+        assert get_project_root(marker_files=["alembic/env.py"], start=sub_dir) == project_root
+        assert (
+            get_project_root(marker_files=["setup.py", "alembic/env.py"], start=sub_dir)
+            == project_root
+        )
 
     def test_get_project_root_no_marker(self, tmp_path):
         """Test get_project_root when no marker is found."""
         empty_dir = tmp_path / "empty"
         empty_dir.mkdir()
 
-        with patch("pathlib.Path.cwd", return_value=empty_dir):
-            # It should return current directory if no marker found in parents
-            root = get_project_root()
-            assert root == empty_dir
+        # It should return the start directory if no marker found in parents
+        root = get_project_root(start=empty_dir)
+        assert root == empty_dir
 
     @patch("alembic_autoscan.integration.get_project_root")
     @patch("alembic_autoscan.integration.import_models")
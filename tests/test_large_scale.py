@@ -1,27 +1,14 @@
-import json
 import tempfile
 import time
 from pathlib import Path
+from unittest.mock import patch
 
 import pytest
 
-from alembic_autoscan.scanner import ModelScanner
+from alembic_autoscan.scanner import ModelScanner, _parse_memo, _scan_memo
 
-
-def test_large_scale_scanning_with_cache():
-    """Test scanning a large number of models with caching enabled."""
-    num_models = 50  # Enough to demonstrate "a lot" without being too slow
-
-    with tempfile.TemporaryDirectory() as tmpdir:
-        base_path = Path(tmpdir)
-        models_dir = base_path / "models"
-        models_dir.mkdir()
-
-        # Create a large number of model files
-        for i in range(num_models):
-            model_file = models_dir / f"model_{i}.py"
-            model_file.write_text(
-                f"""
+# Model module sources, formatted with the model number i
+MODEL_TEMPLATE = """
 from sqlalchemy import Column, Integer, String
 from sqlalchemy.ext.declarative import declarative_base
 
@@ -32,7 +19,44 @@ class Model{i}(Base):
     id = Column(Integer, primary_key=True)
     name = Column(String)
 """
+
+PERF_MODEL_TEMPLATE = """
+from sqlalchemy import Column, Integer, String
+from sqlalchemy.ext.declarative import declarative_base
+
+Base = declarative_base()
+
+class PerfModel{i}(Base):
+    __tablename__ = "perf_table_{i}"
+    id = Column(Integer, primary_key=True)
+"""
+
+
+def _forget_scans():
+    """Drop the scan results memoised in this process, so the next scan parses again."""
+    _scan_memo.clear()
+    _parse_memo.clear()
+
+
+def test_large_scale_scanning_with_cache():
+    """Test scanning a large number of models with caching enabled."""
+    num_models = 50  # Enough to demonstrate "a lot" without being too slow
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        base_path = Path(tmpdir)
+        models_dir = base_path / "models"
+        models_dir.mkdir()
+
+        # Create a large number of model files, formatted up front and written as bytes
+        files = [
+            (
+                models_dir / f"model_{i}.py",
+                MODEL_TEMPLATE.format_map({"i": i}).encode(),
             )
+            for i in range(num_models)
+        ]
+        for model_file, content in files:
+            model_file.write_bytes(content)
 
         # First scan - should populate cache
         start_time = time.time()
@@ -49,15 +73,12 @@ class Model{i}(Base):
         assert cache_file.exists()
 
         # Verify cache content structure
-        with cache_file.open() as f:
-            cache_data = json.load(f)
-            # There should be at least one key (the hash)
-            assert len(cache_data) > 0
-            # Inspect the first key
-            cache_key = list(cache_data.keys())[0]
-            entries = cache_data[cache_key]
-            # Should have entries for all our files
-            assert len(entries) >= num_models
+        entries = scanner.cache.load(
+            str(scanner.base_path), scanner.include_patterns, scanner.exclude_patterns
+        )
+        assert entries is not None
+        # Should have entries for all our files
+        assert len(entries) >= num_models
 
         # Second scan - should use cache
         # We re-instantiate to ensure it loads from disk
@@ -93,29 +114,28 @@ def test_performance_improvement():
         models_dir = base_path / "models"
         models_dir.mkdir()
 
-        # Generate models
-        for i in range(num_models):
-            (models_dir / f"perf_model_{i}.py").write_text(
-                f"""
-from sqlalchemy import Column, Integer, String
-from sqlalchemy.ext.declarative import declarative_base
-
-Base = declarative_base()
-
-class PerfModel{i}(Base):
-    __tablename__ = "perf_table_{i}"
-    id = Column(Integer, primary_key=True)
-"""
+        # Generate models, formatted up front and written as bytes
+        files = [
+            (
+                models_dir / f"perf_model_{i}.py",
+                PERF_MODEL_TEMPLATE.format_map({"i": i}).encode(),
             )
+            for i in range(num_models)
+        ]
+        for model_file, content in files:
+            model_file.write_bytes(content)
 
         # 1. No Cache (Baseline)
+        _forget_scans()
         start_no_cache = time.perf_counter()
         scanner_no_cache = ModelScanner(base_path=str(base_path), cache_enabled=False)
         scanner_no_cache.discover()
         duration_no_cache = time.perf_counter() - start_no_cache
 
         # 2. Cold Scan (Cache Enabled but empty)
-        # We use a new scanner instance for each run to be fair
+        # We use a new scanner instance for each run to be fair, and forget the
+        # results the baseline left in memory so this scan really parses
+        _forget_scans()
         start_cold = time.perf_counter()
         scanner1 = ModelScanner(base_path=str(base_path), cache_enabled=True)
         scanner1.discover()
@@ -124,7 +144,8 @@ class PerfModel{i}(Base):
         # 3. Warm Scan (Cache Enabled and populated)
         start_warm = time.perf_counter()
         scanner2 = ModelScanner(base_path=str(base_path), cache_enabled=True)
-        scanner2.discover()
+        with patch("alembic_autoscan.scanner.scan_file_worker") as mock_worker:
+            discovered = scanner2.discover()
         duration_warm = time.perf_counter() - start_warm
 
         print(f"\nPerformance Result (N={num_models}):")
@@ -137,8 +158,7 @@ class PerfModel{i}(Base):
             print(f"Speedup vs Cold: {duration_cold / duration_warm:.2f}x")
             print(f"Speedup vs No Cache: {duration_no_cache / duration_warm:.2f}x")
 
-        # Assert that using the cache is faster
-        # Note: On extremely fast creates/scans or busy systems, this could theoretically flake,
-        # but with 100 files parsing vs reading a single JSON, it should be robust.
-        assert duration_warm < duration_cold, "Cached scan should be faster than cold scan"
-        assert duration_warm < duration_no_cache, "Cached scan should be faster than no cache"
+        # Single wall-clock timings are too noisy on busy CI machines to compare, see
+        # test_benchmarks.py for measured timings. Check the cache did its job instead.
+        assert len(discovered) == num_models
+        mock_worker.assert_not_called()
@@ -1,13 +1,10 @@
-import runpy
-import sys
-from unittest.mock import patch
-
 import pytest
 
+from alembic_autoscan.__main__ import main
+
 
 def test_main_module_invocation():
-    # Mock sys.argv to avoid actually doing anything
-    # We use --version or --help to exit quickly
-    with patch.object(sys, "argv", ["alembic-autoscan", "--version"]):
-        with pytest.raises(SystemExit):
-            runpy.run_module("alembic_autoscan", run_name="__main__")
+    # --help exits straight away without scanning anything
+    with pytest.raises(SystemExit) as exc_info:
+        main(["--help"])
+    assert exc_info.value.code == 0
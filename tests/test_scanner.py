@@ -1,11 +1,28 @@
-import json
-import tempfile
+import os
+import re
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from unittest.mock import MagicMock, patch
 
 import pytest
 
-from alembic_autoscan.scanner import ModelScanner, scan_file_worker
+from alembic_autoscan.scanner import (
+    _PATH_CASE_FLAGS,
+    ModelScanner,
+    _compile_pattern,
+    _compile_patterns,
+    _get_executor,
+    _parse_memo,
+    _parse_source,
+    _path_lines,
+    _pathlib_regex,
+    _scan_class_body,
+    _scan_memo,
+    scan_file_worker,
+    scan_source,
+)
 
 
 class TestModelScanner:
@@ -34,6 +51,101 @@ class TestModelScanner:
         # Test exclude pattern
         assert scanner._matches_pattern(Path("venv/lib/test.py"), ["**/venv/**"])
 
+    @pytest.mark.parametrize(
+        "path, pattern, expected",
+        [
+            ("venv/lib/test.py", "venv", True),
+            ("app/tests/test_user.py", "**/tests/**", True),
+            ("app/models/user.py", "app/**/user.py", True),
+            ("app/models/user.py", "**/models/user.py", True),
+            ("app/models/user.py", "**/tests/**", False),
+            ("app/models/user.py", "tests", False),
+        ],
+    )
+    def test_pattern_matching_variants(self, path, pattern, expected):
+        """Test the directory-name and globstar fallbacks of pattern matching."""
+        scanner = ModelScanner()
+        assert scanner._matches_pattern(Path(path), [pattern]) is expected
+
+    def test_walked_files_resolve_only_symlinks(self, tmp_path):
+        """Test that only symlinked files are resolved when walking the base path."""
+        (tmp_path / "app").mkdir()
+        (tmp_path / "app" / "user.py").write_text("")
+        (tmp_path / "shared.py").write_text("")
+        (tmp_path / "app" / "link.py").symlink_to(tmp_path / "shared.py")
+
+        scanner = ModelScanner(base_path=str(tmp_path), cache_enabled=False)
+        with patch.object(Path, "resolve", autospec=True, side_effect=Path.resolve) as mock:
+            resolved = {
+                entry.name: scanner._resolve_entry(entry) for entry in scanner._iter_python_files()
+            }
+
+        base = tmp_path.resolve()
+        assert resolved["user.py"] == (
+            str(base / "app" / "user.py"),
+            os.path.join("app", "user.py"),
+        )
+        assert resolved["link.py"] == (str(base / "shared.py"), "shared.py")
+        assert {call.args[0].name for call in mock.call_args_list} == {"link.py"}
+
+    def test_gitignore_patterns_match_as_one_set(self, tmp_path):
+        """Test that a long .gitignore is folded into the combined exclude matchers."""
+        rules = [f"generated_{i}/" for i in range(200)] + ["*_pb2.py", "*.tmp*.py"]
+        (tmp_path / ".gitignore").write_text("\n".join(rules))
+        scanner = ModelScanner(base_path=str(tmp_path))
+
+        assert scanner._matches_pattern(Path("generated_150/models.py"), scanner.exclude_patterns)
+        assert scanner._matches_pattern(Path("app/user_pb2.py"), scanner.exclude_patterns)
+        assert scanner._matches_pattern(Path("app/a.tmp1.py"), scanner.exclude_patterns)
+        assert not scanner._matches_pattern(Path("app/user.py"), scanner.exclude_patterns)
+
+    def test_patterns_compiled_once_across_sets(self, tmp_path):
+        """Test that pattern sets sharing the default excludes reuse their compiled forms."""
+        (tmp_path / ".gitignore").write_text("build/\n")
+        ModelScanner(base_path=str(tmp_path))._matches_pattern(Path("a.py"), ["**/venv/**"])
+        misses = _compile_pattern.cache_info().misses
+
+        scanner = ModelScanner(base_path=str(tmp_path), exclude_patterns=["*_pb2.py"])
+        scanner._matches_pattern(Path("a.py"), ["**/venv/**", "*_pb2.py"])
+        assert _compile_pattern.cache_info().misses == misses + 1
+
+    def test_suffix_patterns_skip_regexes(self):
+        """Test that patterns like **/*.py are matched by suffix, without any regex."""
+        pattern_set = _compile_patterns(("**/*.py", "*_pb2.py"))
+        assert pattern_set.suffixes == (".py", "_pb2.py")
+        assert pattern_set.fnmatch_regex is None
+        assert pattern_set.lines_regex is None
+
+        scanner = ModelScanner(base_path=".")
+        assert scanner._matches_pattern(Path("user.py"), ["**/*.py"])
+        assert scanner._matches_pattern(Path("app/user_pb2.py"), ["*_pb2.py"])
+        assert not scanner._matches_pattern(Path("app/user.pyi"), ["**/*.py", "*_pb2.py"])
+
+    @pytest.mark.parametrize(
+        "pattern", ["*.py", "app/*.py", "/app/*", "a*/models/*", "[ab]*/*.py", "**/user.py"]
+    )
+    def test_path_regex_matches_like_pathlib(self, pattern):
+        """Test that the pathlib-style pattern regex agrees with PurePath.match."""
+        regex = re.compile(_pathlib_regex(pattern), re.MULTILINE | _PATH_CASE_FLAGS)
+        for path in ("user.py", "app/user.py", "/app/user.py", "app/models/user.py", "b/x.py"):
+            expected = Path(path).match(pattern)
+            assert (regex.search(_path_lines(Path(path))) is not None) is expected, path
+
+    def test_walk_prunes_excluded_directories(self, tmp_path):
+        """Test that excluded directories are never listed during discovery."""
+        (tmp_path / "app").mkdir()
+        (tmp_path / "app" / "models.py").write_text("")
+        (tmp_path / "node_modules" / "pkg").mkdir(parents=True)
+        (tmp_path / "node_modules" / "pkg" / "setup.py").write_text("")
+
+        scanner = ModelScanner(base_path=str(tmp_path), cache_enabled=False)
+        with patch("alembic_autoscan.scanner.os.scandir", wraps=os.scandir) as mock_scandir:
+            files = [Path(entry.path) for entry in scanner._iter_python_files()]
+
+        assert files == [tmp_path / "app" / "models.py"]
+        listed = {call.args[0] for call in mock_scandir.call_args_list}
+        assert str(tmp_path / "node_modules") not in listed
+
     def test_should_scan_file(self):
         """Test file scanning decision logic."""
         scanner = ModelScanner(
@@ -51,11 +163,7 @@ class TestModelScanner:
 
     def test_detect_sqlalchemy_model_with_base(self):
         """Test detection of SQLAlchemy models inheriting from Base."""
-        with tempfile.TemporaryDirectory() as tmpdir:
-            # Create a test model file
-            model_file = Path(tmpdir) / "user.py"
-            model_file.write_text(
-                """
+        source = b"""
 from sqlalchemy import Column, Integer, String
 from database import Base
 
@@ -64,235 +172,482 @@ class User(Base):
     id = Column(Integer, primary_key=True)
     name = Column(String(50))
 """
-            )
+        _, is_model, _, _ = scan_source(source, "user.py")
+        assert is_model
+
+    def test_file_without_model_markers_is_not_parsed(self, tmp_path):
+        """Test that files mentioning no model indicator skip AST parsing."""
+        plain_file = tmp_path / "helpers.py"
+        plain_file.write_text("class Helper(Base):\n    name = 'helper'\n")
+
+        with patch("alembic_autoscan.scanner._parse_source") as mock_parse:
+            assert scan_file_worker(str(plain_file))[:3] == (str(plain_file), False, ())
+        mock_parse.assert_not_called()
+
+    def test_unreadable_file_has_no_digest(self, tmp_path):
+        """Test that a file which cannot be read is reported as a non-model without a digest."""
+        missing = str(tmp_path / "missing.py")
+        assert scan_file_worker(missing) == (missing, False, (), None)
+
+    def test_rescanning_same_file_is_not_parsed_again(self, tmp_path):
+        """Test that scanning an unchanged file a second time reuses the earlier parse."""
+        model_file = tmp_path / "rescanned.py"
+        model_file.write_text("class Rescanned:\n    __tablename__ = 'rescanned'\n")
 
-            _, is_model, _ = scan_file_worker(model_file)
-            assert is_model
+        first = scan_file_worker(str(model_file))
+        with patch("alembic_autoscan.scanner._parse_source") as mock_parse:
+            assert scan_file_worker(str(model_file)) == first
+        mock_parse.assert_not_called()
 
     def test_detect_sqlalchemy_model_with_tablename(self):
         """Test detection via __tablename__ attribute."""
-        with tempfile.TemporaryDirectory() as tmpdir:
-            model_file = Path(tmpdir) / "post.py"
-            model_file.write_text(
-                """
+        source = b"""
 class Post:
     __tablename__ = "posts"
     id = 1
 """
-            )
-
-            _, is_model, _ = scan_file_worker(model_file)
-            assert is_model
+        _, is_model, _, _ = scan_source(source, "post.py")
+        assert is_model
 
     def test_ignore_non_model_classes(self):
         """Test that non-model classes are ignored."""
-        with tempfile.TemporaryDirectory() as tmpdir:
-            regular_file = Path(tmpdir) / "utils.py"
-            regular_file.write_text(
-                """
+        source = b"""
 class Helper:
     def do_something(self):
         pass
 """
-            )
-
-            _, is_model, _ = scan_file_worker(regular_file)
-            assert not is_model
+        _, is_model, _, _ = scan_source(source, "utils.py")
+        assert not is_model
 
-    def test_module_path_conversion(self):
+    def test_module_path_conversion(self, tmp_path):
         """Test conversion of file paths to module paths."""
-        with tempfile.TemporaryDirectory() as tmpdir:
-            scanner = ModelScanner(base_path=tmpdir)
-
-            # Test regular file
-            file_path = Path(tmpdir) / "app" / "models" / "user.py"
-            module_path = scanner._get_module_path(file_path)
-            assert module_path == "app.models.user"
-
-            # Test __init__.py
-            init_path = Path(tmpdir) / "app" / "models" / "__init__.py"
-            module_path = scanner._get_module_path(init_path)
-            assert module_path == "app.models"
-
-    def test_discover_models_in_directory(self):
+        scanner = ModelScanner(base_path=str(tmp_path))
+
+        # Test regular file
+        file_path = tmp_path / "app" / "models" / "user.py"
+        module_path = scanner._get_module_path(file_path)
+        assert module_path == "app.models.user"
+
+        # Test __init__.py
+        init_path = tmp_path / "app" / "models" / "__init__.py"
+        module_path = scanner._get_module_path(init_path)
+        assert module_path == "app.models"
+
+        # Files outside the base path or in non-package directories have no module path
+        assert scanner._get_module_path(Path("/elsewhere/user.py")) is None
+        assert scanner._get_module_path(tmp_path / "my-app" / "user.py") is None
+        assert scanner._get_module_path(tmp_path / ".venv" / "user.py") is None
+
+        # Invalid file names are rejected even in an importable directory
+        assert scanner._get_module_path(tmp_path / "app" / "user-v2.py") is None
+
+    def test_module_path_parts_shared_per_directory(self, tmp_path):
+        """Test that each directory's module path parts are derived only once."""
+        scanner = ModelScanner(base_path=str(tmp_path))
+
+        with patch.object(
+            scanner, "_module_parts_of", wraps=scanner._module_parts_of
+        ) as mock_parts:
+            assert scanner._get_module_path(tmp_path / "app" / "user.py") == "app.user"
+            assert scanner._get_module_path(tmp_path / "app" / "post.py") == "app.post"
+            assert scanner._get_module_path(tmp_path / "app" / "__init__.py") == "app"
+        mock_parts.assert_called_once()
+
+    def test_discover_models_in_directory(self, tmp_path):
         """Test full discovery process."""
-        with tempfile.TemporaryDirectory() as tmpdir:
-            # Create directory structure
-            models_dir = Path(tmpdir) / "app" / "models"
-            models_dir.mkdir(parents=True)
-
-            # Create model files
-            (models_dir / "user.py").write_text(
-                """
+        # Create directory structure
+        models_dir = tmp_path / "app" / "models"
+        models_dir.mkdir(parents=True)
+
+        # Create model files
+        (models_dir / "user.py").write_text(
+            """
 from database import Base
 class User(Base):
     __tablename__ = "users"
 """
-            )
+        )
 
-            (models_dir / "post.py").write_text(
-                """
+        (models_dir / "post.py").write_text(
+            """
 from database import Base
 class Post(Base):
     __tablename__ = "posts"
 """
-            )
+        )
 
-            # Create non-model file
-            (models_dir / "utils.py").write_text(
-                """
+        # Create non-model file
+        (models_dir / "utils.py").write_text(
+            """
 def helper():
     pass
 """
-            )
+        )
 
-            scanner = ModelScanner(base_path=tmpdir)
-            discovered = scanner.discover()
+        scanner = ModelScanner(base_path=str(tmp_path))
+        discovered = scanner.discover()
 
-            assert "app.models.user" in discovered
-            assert "app.models.post" in discovered
-            assert "app.models.utils" not in discovered
+        assert "app.models.user" in discovered
+        assert "app.models.post" in discovered
+        assert "app.models.utils" not in discovered
 
-    def test_exclude_patterns_work(self):
+    def test_exclude_patterns_work(self, tmp_path):
         """Test that exclude patterns properly filter files."""
-        with tempfile.TemporaryDirectory() as tmpdir:
-            # Create test directory
-            tests_dir = Path(tmpdir) / "tests"
-            tests_dir.mkdir()
-
-            # Create a model-like file in tests
-            (tests_dir / "test_models.py").write_text(
-                """
+        # Create test directory
+        tests_dir = tmp_path / "tests"
+        tests_dir.mkdir()
+
+        # Create a model-like file in tests
+        (tests_dir / "test_models.py").write_text(
+            """
 class User(Base):
     __tablename__ = "users"
 """
-            )
+        )
 
-            scanner = ModelScanner(base_path=tmpdir)
-            discovered = scanner.discover()
+        scanner = ModelScanner(base_path=str(tmp_path))
+        discovered = scanner.discover()
 
-            # Should not discover models in tests directory
-            assert len(discovered) == 0
+        # Should not discover models in tests directory
+        assert len(discovered) == 0
 
     def test_detect_sqlmodel(self):
         """Test detection of SQLModel models."""
-        with tempfile.TemporaryDirectory() as tmpdir:
-            model_file = Path(tmpdir) / "hero.py"
-            model_file.write_text(
-                """
+        source = b"""
 from sqlmodel import SQLModel, Field
 
 class Hero(SQLModel, table=True):
     id: int = Field(default=None, primary_key=True)
 """
-            )
-
-            _, is_model, _ = scan_file_worker(model_file)
-            assert is_model
+        _, is_model, _, _ = scan_source(source, "hero.py")
+        assert is_model
 
     def test_detect_sqlmodel_functional(self):
         """Test detection of SQLModel models with functional syntax."""
-        with tempfile.TemporaryDirectory() as tmpdir:
-            model_file = Path(tmpdir) / "hero.py"
-            model_file.write_text(
-                """
+        source = b"""
 from sqlmodel import SQLModel
 
 class Hero(SQLModel(table=True)):
     pass
 """
-            )
-
-            _, is_model, _ = scan_file_worker(model_file)
-            assert is_model
+        _, is_model, _, _ = scan_source(source, "hero.py")
+        assert is_model
 
     def test_detect_as_declarative_decorator(self):
         """Test detection via decorators."""
-        with tempfile.TemporaryDirectory() as tmpdir:
-            model_file = Path(tmpdir) / "models.py"
-            model_file.write_text(
-                """
+        source = b"""
 from sqlalchemy.ext.declarative import as_declarative
 
 @as_declarative()
 class Base:
     __tablename__ = "base"
 """
-            )
-
-            _, is_model, _ = scan_file_worker(model_file)
-            assert is_model
+        _, is_model, _, _ = scan_source(source, "models.py")
+        assert is_model
 
     def test_detect_mapped_subscript(self):
         """Test detection of Mapped[Type] annotations."""
-        with tempfile.TemporaryDirectory() as tmpdir:
-            model_file = Path(tmpdir) / "models.py"
-            model_file.write_text(
-                """
+        source = b"""
 from sqlalchemy.orm import Mapped, DeclarativeBase
 
 class User(DeclarativeBase):
     __tablename__ = "users"
     id: Mapped[int]
 """
-            )
-
-            _, is_model, _ = scan_file_worker(model_file)
-            assert is_model
+        _, is_model, _, _ = scan_source(source, "models.py")
+        assert is_model
 
     def test_detect_imperative_mapping(self):
         """Test detection of imperative mapping."""
-        with tempfile.TemporaryDirectory() as tmpdir:
-            model_file = Path(tmpdir) / "models.py"
-            model_file.write_text(
-                """
+        source = b"""
 from sqlalchemy.orm import registry
 reg = registry()
 reg.map_imperatively(User, table)
 """
-            )
+        _, is_model, _, _ = scan_source(source, "models.py")
+        assert is_model
+
+    @pytest.mark.parametrize(
+        "source",
+        [
+            b"if True:\n    class User:\n        __tablename__ = 'users'\n",
+            b"try:\n    pass\nexcept ImportError:\n    class User:\n        __tablename__ = 'u'\n",
+            b"def build():\n    class User:\n        __tablename__ = 'users'\n",
+            b"class Outer:\n    class User:\n        __tablename__ = 'users'\n",
+            b"def setup(reg):\n    mappers = [reg.map_imperatively(User, table)]\n",
+        ],
+    )
+    def test_detect_nested_models(self, source):
+        """Test that models nested in blocks, functions or classes are detected."""
+        _, is_model, _, _ = scan_source(source, "models.py")
+        assert is_model
+
+    def test_stop_at_first_model_without_abstracts(self):
+        """Test that the worker can stop at the first model instead of collecting abstracts."""
+        source = (
+            b"class User:\n    __tablename__ = 'users'\n\nclass Base:\n    __abstract__ = True\n"
+        )
 
-            _, is_model, _ = scan_file_worker(model_file)
-            assert is_model
+        assert scan_source(source, "models.py")[1:3] == (True, ("Base",))
+        with patch(
+            "alembic_autoscan.scanner._scan_class_body", wraps=_scan_class_body
+        ) as mock_body:
+            assert scan_source(source, "models.py", collect_abstracts=False)[1:3] == (True, ())
+        assert mock_body.call_count == 1
 
-    def test_discover_with_cache(self):
+    def test_discover_with_cache(self, tmp_path):
         """Test discovery with cache enabled."""
-        with tempfile.TemporaryDirectory() as tmpdir:
-            models_dir = Path(tmpdir)
-            model_file = models_dir / "user.py"
-            model_file.write_text("class User:\n    __tablename__ = 'users'")
-
-            scanner = ModelScanner(base_path=tmpdir, cache_enabled=True)
-            discovered = scanner.discover()
-
-            assert "user" in discovered
-            cache_file = Path(tmpdir) / ".alembic-autoscan.cache"
-            assert cache_file.exists()
-
-            # Verify cache content
-            with cache_file.open() as f:
-                data = json.load(f)
-                # Should find an entry where user keys exist
-                # Format: {"hash": {"filepath": {...}}}
-                assert len(data) > 0
-                first_key = list(data.keys())[0]
-                assert str(model_file.resolve()) in data[first_key]
-                assert data[first_key][str(model_file.resolve())]["is_model"] is True
-
-    def test_import_models(self):
+        models_dir = tmp_path
+        model_file = models_dir / "user.py"
+        model_file.write_text("class User:\n    __tablename__ = 'users'")
+
+        scanner = ModelScanner(base_path=str(tmp_path), cache_enabled=True)
+        discovered = scanner.discover()
+
+        assert "user" in discovered
+        cache_file = tmp_path / ".alembic-autoscan.cache"
+        assert cache_file.exists()
+
+        # Verify cache content
+        data = scanner.cache.load(
+            str(scanner.base_path), scanner.include_patterns, scanner.exclude_patterns
+        )
+        assert data is not None
+        assert str(model_file.resolve()) in data
+        is_model = data[str(model_file.resolve())][1]
+        assert is_model is True
+
+    def test_rediscover_from_cache_writes_nothing(self, tmp_path):
+        """Test that an unchanged tree is served from cache without touching the cache file."""
+        (tmp_path / "user.py").write_text("class User:\n    __tablename__ = 'users'")
+        (tmp_path / "helpers.py").write_text("def helper():\n    pass")
+
+        scanner = ModelScanner(base_path=str(tmp_path), cache_enabled=True)
+        assert scanner.discover() == ["user"]
+        cache_size = scanner.cache.cache_file.stat().st_size
+
+        assert scanner.discover() == ["user"]
+        assert scanner.cache.cache_file.stat().st_size == cache_size
+
+    def test_rediscover_rescans_modified_file(self, tmp_path):
+        """Test that a file whose mtime changed is scanned again instead of served from cache."""
+        model_file = tmp_path / "user.py"
+        model_file.write_text("def helper():\n    pass")
+
+        scanner = ModelScanner(base_path=str(tmp_path), cache_enabled=True)
+        assert scanner.discover() == []
+
+        model_file.write_text("class User:\n    __tablename__ = 'users'")
+        stat = model_file.stat()
+        os.utime(model_file, (stat.st_atime, stat.st_mtime + 10))
+        assert scanner.discover() == ["user"]
+
+    def test_rediscover_rescans_resized_file_with_same_mtime(self, tmp_path):
+        """Test that an edit keeping the mtime, e.g. on a coarse clock, is still picked up."""
+        model_file = tmp_path / "user.py"
+        model_file.write_text("def helper():\n    pass")
+        mtime_ns = model_file.stat().st_mtime_ns
+
+        scanner = ModelScanner(base_path=str(tmp_path), cache_enabled=True)
+        assert scanner.discover() == []
+
+        model_file.write_text("class User:\n    __tablename__ = 'users'")
+        os.utime(model_file, ns=(mtime_ns, mtime_ns))
+        assert scanner.discover() == ["user"]
+
+    def test_rediscover_parses_only_modified_file(self, tmp_path):
+        """Test that editing one file of a scanned tree parses that file alone again."""
+        for i in range(5):
+            (tmp_path / f"model_{i}.py").write_text(
+                f"class Model{i}:\n    __tablename__ = 'model_{i}'\n"
+            )
+
+        scanner = ModelScanner(base_path=str(tmp_path), cache_enabled=True)
+        assert len(scanner.discover()) == 5
+
+        model_file = tmp_path / "model_2.py"
+        model_file.write_text("class Renamed:\n    __tablename__ = 'renamed'\n")
+        stat = model_file.stat()
+        os.utime(model_file, (stat.st_atime, stat.st_mtime + 10))
+        with patch(
+            "alembic_autoscan.scanner._parse_source", side_effect=_parse_source
+        ) as mock_parse:
+            assert len(scanner.discover()) == 5
+        mock_parse.assert_called_once()
+        assert mock_parse.call_args.args[1] == str(model_file)
+
+    def test_rediscover_skips_touched_unchanged_file(self, tmp_path):
+        """Test that a file whose mtime changed but contents did not is served from cache."""
+        model_file = tmp_path / "user.py"
+        model_file.write_text("class User:\n    __tablename__ = 'users'")
+
+        scanner = ModelScanner(base_path=str(tmp_path), cache_enabled=True)
+        assert scanner.discover() == ["user"]
+
+        stat = model_file.stat()
+        os.utime(model_file, (stat.st_atime, stat.st_mtime + 10))
+        with patch("alembic_autoscan.scanner.scan_file_worker") as mock_worker:
+            assert scanner.discover() == ["user"]
+        mock_worker.assert_not_called()
+
+        # The new mtime is cached, so the contents are not compared again
+        with patch.object(scanner.cache, "is_content_unchanged") as mock_compare:
+            assert scanner.discover() == ["user"]
+        mock_compare.assert_not_called()
+
+    @pytest.mark.parametrize(
+        "mtime_ns, strict_hash", [(10**9, False), (1_700_000_000 * 10**9, True)]
+    )
+    def test_rediscover_compares_contents_when_mtime_untrusted(
+        self, tmp_path, mtime_ns, strict_hash
+    ):
+        """Test that same-size edits are caught for epoch mtimes or with strict_hash."""
+        model_file = tmp_path / "user.py"
+        model_file.write_text("class User:\n    __tablename_ = 'users'")
+        os.utime(model_file, ns=(mtime_ns, mtime_ns))
+
+        scanner = ModelScanner(base_path=str(tmp_path), strict_hash=strict_hash)
+        assert scanner.discover() == []
+
+        model_file.write_text("class User:\n    __tablename__ = 'user'")
+        os.utime(model_file, ns=(mtime_ns, mtime_ns))
+        assert scanner.discover() == ["user"]
+
+    def test_discover_reuses_scans_across_scanners(self, tmp_path):
+        """Test that a file scanned by one scanner is not parsed again by another."""
+        (tmp_path / "user.py").write_text("class User:\n    __tablename__ = 'users'")
+
+        assert ModelScanner(base_path=str(tmp_path), cache_enabled=False).discover() == ["user"]
+        scanner = ModelScanner(base_path=str(tmp_path), exclude_patterns=["*_pb2.py"])
+        with patch("alembic_autoscan.scanner.scan_file_worker") as mock_worker:
+            assert scanner.discover() == ["user"]
+        mock_worker.assert_not_called()
+
+    def test_identical_files_parsed_once(self, tmp_path):
+        """Test that copies of the same source are parsed once and all reported."""
+        source = "class Vendored:\n    __tablename__ = 'vendored'\n"
+        for name in ("a", "b"):
+            (tmp_path / name).mkdir()
+            (tmp_path / name / "vendored.py").write_text(source)
+
+        scanner = ModelScanner(base_path=str(tmp_path), cache_enabled=False)
+        with patch(
+            "alembic_autoscan.scanner._parse_source", side_effect=_parse_source
+        ) as mock_parse:
+            assert scanner.discover() == ["a.vendored", "b.vendored"]
+        assert mock_parse.call_count == 1
+
+    def test_discover_skips_oversized_and_empty_files(self, tmp_path, caplog):
+        """Test that files over max_file_bytes and empty files are never read."""
+        source = "class User:\n    __tablename__ = 'users'\n"
+        (tmp_path / "user.py").write_text(source)
+        (tmp_path / "generated.py").write_text(source + "#" * 100)
+        (tmp_path / "empty.py").write_text("")
+
+        scanner = ModelScanner(base_path=str(tmp_path), cache_enabled=False, max_file_bytes=100)
+        with patch(
+            "alembic_autoscan.scanner.scan_file_worker", wraps=scan_file_worker
+        ) as mock_worker:
+            assert scanner.discover() == ["user"]
+        mock_worker.assert_called_once_with(
+            str((tmp_path / "user.py").resolve()), collect_abstracts=True
+        )
+        generated = str((tmp_path / "generated.py").resolve())
+        assert any(
+            record.levelname == "WARNING"
+            and generated in record.message
+            and "140 bytes" in record.message
+            for record in caplog.records
+        )
+
+        scanner = ModelScanner(base_path=str(tmp_path), cache_enabled=False, max_file_bytes=None)
+        assert scanner.discover() == ["generated", "user"]
+
+    def test_parallel_scan_uses_threads_without_gil(self, tmp_path):
+        """Test that free-threaded builds scan on a reused thread pool."""
+        for name in ("user", "post"):
+            (tmp_path / f"{name}.py").write_text(f"class M:\n    __tablename__ = '{name}'")
+
+        with patch("alembic_autoscan.scanner._executor", None), patch(
+            "alembic_autoscan.scanner.sys._is_gil_enabled", return_value=False, create=True
+        ), patch.dict(_scan_memo, clear=True), patch.dict(_parse_memo, clear=True):
+            scanner = ModelScanner(
+                base_path=str(tmp_path), cache_enabled=False, parallel_enabled=True
+            )
+            assert scanner.discover() == ["post", "user"]
+
+            executor = _get_executor()
+            assert isinstance(executor, ThreadPoolExecutor)
+
+            # Forget the scans so that the second discovery has to run the workers again
+            _scan_memo.clear()
+            _parse_memo.clear()
+            with patch.object(executor, "map", wraps=executor.map) as mock_map, patch(
+                "alembic_autoscan.scanner._parse_source", side_effect=_parse_source
+            ) as mock_parse:
+                assert scanner.discover() == ["post", "user"]
+            mock_map.assert_called_once()
+            assert mock_parse.call_count == 2
+            assert _get_executor() is executor
+            executor.shutdown()
+
+    def test_parallel_scan_from_unguarded_script(self, tmp_path):
+        """Test that pool workers do not re-run a script without a __main__ guard."""
+        models = tmp_path / "models"
+        models.mkdir()
+        for name in ("user", "post"):
+            (models / f"{name}.py").write_text(f"class M:\n    __tablename__ = '{name}'")
+
+        script = tmp_path / "env.py"
+        script.write_text(
+            "import logging\n"
+            "import sys\n"
+            "from alembic_autoscan.scanner import ModelScanner\n"
+            "logging.basicConfig(level=logging.WARNING)\n"
+            "print('script ran')\n"
+            "scanner = ModelScanner(base_path=sys.argv[1], cache_enabled=False, "
+            "parallel_enabled=True)\n"
+            "print(scanner.discover())\n"
+        )
+
+        env = dict(os.environ, PYTHONPATH=str(Path(__file__).resolve().parents[1]))
+        result = subprocess.run(  # noqa: S603
+            [sys.executable, str(script), str(models)],
+            capture_output=True,
+            text=True,
+            cwd=tmp_path,
+            env=env,
+            timeout=60,
+        )
+
+        assert result.returncode == 0, result.stderr
+        assert result.stdout.count("script ran") == 1
+        assert "['post', 'user']" in result.stdout
+        assert "falling back" not in result.stderr
+
+    def test_import_models(self, tmp_path):
         """Test importing discovered models."""
-        with tempfile.TemporaryDirectory() as tmpdir:
-            model_file = Path(tmpdir) / "mymodel.py"
-            model_file.write_text("class User:\n    __tablename__ = 'users'")
+        model_file = tmp_path / "mymodel.py"
+        model_file.write_text("class User:\n    __tablename__ = 'users'")
 
-            scanner = ModelScanner(base_path=tmpdir)
-            scanner.discover()
+        scanner = ModelScanner(base_path=str(tmp_path))
+        scanner.discover()
 
-            # Mock importlib.import_module
-            with patch("importlib.import_module") as mock_import:
-                count = scanner.import_models()
-                assert count == 1
-                mock_import.assert_called_with("mymodel")
+        # Mock importlib.import_module
+        with patch("importlib.import_module") as mock_import:
+            count = scanner.import_models()
+            assert count == 1
+            mock_import.assert_called_with("mymodel")
+
+    def test_import_models_skips_imported_modules(self):
+        """Test that modules already in sys.modules are counted without importing again."""
+        scanner = ModelScanner()
+
+        with patch.dict("sys.modules", {"already_imported": MagicMock(), "pending": None}), patch(
+            "alembic_autoscan.scanner.importlib.import_module"
+        ) as mock_import:
+            assert scanner.import_models(["already_imported", "pending"]) == 2
+        mock_import.assert_called_once_with("pending")
 
     def test_import_models_error(self, capsys):
         """Test importing models with errors."""
@@ -310,6 +665,20 @@ reg.map_imperatively(User, table)
             captured = capsys.readouterr()
             assert "Warning: Could not import nonexistent: test" in captured.err
 
+    def test_import_models_reports_failures_in_one_write(self):
+        """Test that the warnings of several failed imports are written together."""
+        scanner = ModelScanner()
+
+        with patch("alembic_autoscan.scanner.sys.stderr") as mock_stderr:
+            with patch(
+                "alembic_autoscan.scanner.importlib.import_module", side_effect=ImportError("test")
+            ):
+                assert scanner.import_models(["missing_a", "missing_b"]) == 0
+
+        mock_stderr.write.assert_called_once_with(
+            "Warning: Could not import missing_a: test\nWarning: Could not import missing_b: test\n"
+        )
+
     def test_matches_pattern_relative_error(self):
         """Test _matches_pattern when relative_to fails."""
         scanner = ModelScanner(base_path="/tmp")
@@ -320,48 +689,36 @@ reg.map_imperatively(User, table)
 
     def test_detect_attribute_base(self):
         """Test detection of class User(db.Model)."""
-        with tempfile.TemporaryDirectory() as tmpdir:
-            model_file = Path(tmpdir) / "models.py"
-            model_file.write_text(
-                """
+        source = b"""
 import flask_sqlalchemy
 db = flask_sqlalchemy.SQLAlchemy()
 class User(db.Model):
     __tablename__ = "users"
 """
-            )
-            _, is_model, _ = scan_file_worker(model_file)
-            assert is_model
+        _, is_model, _, _ = scan_source(source, "models.py")
+        assert is_model
 
     def test_detect_functional_base(self):
         """Test detection of class User(declarative_base())."""
-        with tempfile.TemporaryDirectory() as tmpdir:
-            model_file = Path(tmpdir) / "models.py"
-            model_file.write_text(
-                """
+        source = b"""
 from sqlalchemy.ext.declarative import declarative_base
 Base = declarative_base()
 class User(Base):
     __tablename__ = "users"
 """
-            )
-            _, is_model, _ = scan_file_worker(model_file)
-            assert is_model
+        _, is_model, _, _ = scan_source(source, "models.py")
+        assert is_model
 
     def test_ignore_abstract_class(self):
         """Test that abstract classes are ignored."""
-        with tempfile.TemporaryDirectory() as tmpdir:
-            model_file = Path(tmpdir) / "models.py"
-            model_file.write_text(
-                """
+        source = b"""
 class Base:
     __abstract__ = True
     __tablename__ = "base"
 """
-            )
-            _, is_model, abstracts = scan_file_worker(model_file)
-            assert not is_model
-            assert "Base" in abstracts
+        _, is_model, abstracts, _ = scan_source(source, "models.py")
+        assert not is_model
+        assert "Base" in abstracts
 
 
 if __name__ == "__main__":